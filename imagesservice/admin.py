@@ -4,7 +4,7 @@ from django.contrib.auth.models import User as DefaultUser
 from django.http.request import HttpRequest
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import (AccountTier, ThumbnailSize, UserAccountTier, Image, ThumbnailImage, ExpiringImage)
+from .models import (AccountTier, ThumbnailSize, UserAccountTier, Image, ThumbnailImage, ExpiringImage, ThumbnailJob, EncoderProfile)
 
 
 class UserInline(admin.TabularInline):
@@ -34,7 +34,7 @@ class ThumbnailSizeInline(admin.TabularInline):
 @admin.register(AccountTier)
 class AccountTierAdmin(admin.ModelAdmin):
     inlines = (ThumbnailSizeInline, )
-    list_display = ('__str__', 'is_builtin')
+    list_display = ('__str__', 'is_builtin', 'encoder_profile', 'min_resize_height', 'max_resize_height')
     exclude = ('is_builtin',)
 
     def has_change_permission(self, request, obj=None):
@@ -48,9 +48,14 @@ class AccountTierAdmin(admin.ModelAdmin):
         return super().has_delete_permission(request, obj=obj)
 
 
+@admin.register(EncoderProfile)
+class EncoderProfileAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'quality', 'progressive', 'optimize', 'subsampling', 'strip_metadata', 'png_compress_level')
+
+
 @admin.register(ThumbnailSize)
 class ThumbnailSizeAdmin(admin.ModelAdmin):
-    list_display = ('__str__', 'is_builtin')
+    list_display = ('__str__', 'is_builtin', 'encoder_profile')
     exclude = ('is_builtin',)
 
     def has_change_permission(self, request, obj=None):
@@ -67,7 +72,7 @@ class ThumbnailSizeAdmin(admin.ModelAdmin):
 class ThumbnailImagesInline(admin.TabularInline):
     model = ThumbnailImage
     extra = 0
-    readonly_fields = ('height', 'get_image_url', 'filename')
+    readonly_fields = ('height', 'width', 'format', 'size_bytes', 'get_image_url', 'filename')
 
     def has_add_permission(self, *args) -> bool:
         return False
@@ -99,8 +104,9 @@ class ExpiringImagesInline(admin.TabularInline):
 
 @admin.register(Image)
 class ImagesAdmin(admin.ModelAdmin):
-    list_display = ('__str__', 'image_tag', 'get_user_link')
-    readonly_fields = ('image_tag', 'get_image_url', 'upload_datetime', 'update_datetime')
+    list_display = ('__str__', 'image_tag', 'get_dimensions', 'thumbnails_status', 'get_user_link')
+    readonly_fields = ('image_tag', 'get_image_url', 'upload_datetime', 'update_datetime', 'thumbnails_status', 'get_dimensions', 'format',
+                       'size_bytes')
     inlines = (ThumbnailImagesInline, ExpiringImagesInline)
     ordering = ('-upload_datetime',)
     list_filter = ('user', )
@@ -109,7 +115,8 @@ class ImagesAdmin(admin.ModelAdmin):
     fieldsets = (
         (None, {
             "fields": (
-                "user", "image_tag", "get_image_url", "filename", "upload_datetime", "update_datetime"
+                "user", "image_tag", "get_image_url", "filename", "get_dimensions", "format", "size_bytes", "upload_datetime",
+                "update_datetime", "thumbnails_status"
             ),
         }),
     )
@@ -124,6 +131,12 @@ class ImagesAdmin(admin.ModelAdmin):
         link = obj.image_url
         return mark_safe(f'<a href="{link}">{link}</a>')
 
+    @admin.display(description="Dimensions")
+    def get_dimensions(self, obj):
+        if obj.width is None:
+            return "-"
+        return f"{obj.width} x {obj.height} px"
+
 
 # @admin.register(ThumbnailImage)
 class ThumbnailImagesAdmin(admin.ModelAdmin):
@@ -200,3 +213,14 @@ class ExpiringImagesAdmin(admin.ModelAdmin):
         return False
 
     get_is_active.boolean = True
+
+
+@admin.register(ThumbnailJob)
+class ThumbnailJobsAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'status', 'attempts', 'available_at', 'locked_by', 'update_datetime')
+    ordering = ('-creation_datetime',)
+    list_filter = ('status', )
+    readonly_fields = ('image', 'attempts', 'locked_by', 'locked_until', 'last_error', 'creation_datetime', 'update_datetime')
+
+    def has_add_permission(self, request: HttpRequest) -> bool:
+        return False
@@ -1,11 +1,14 @@
+from typing import List
+from PIL import Image as PIL_Image, UnidentifiedImageError
+from django.db.models import Manager, Prefetch
 from django.utils import timezone
 from rest_framework import serializers
 from django.core.validators import MinValueValidator, MaxValueValidator
 from rest_framework.validators import ValidationError
 from django.conf import settings
 from django.core.validators import FileExtensionValidator
-from ..utils import validate_image_min_height
-from ..models import ExpiringImage, Image, ThumbnailImage
+from ..utils import probe_image, validate_image_max_pixels, validate_image_min_height
+from ..models import ExpiringImage, Image, ThumbnailImage, get_user_tier_capabilities
 from ..config import EXPIRE_AFTER_MIN, EXPIRE_AFTER_MAX
 
 EXPIRING_IMAGES_EXPIRE_AFTER_VALIDATORS = [
@@ -22,9 +25,31 @@ def get_host(instance):
     return f"{protocol}://{host}"
 
 
+def get_allowed_thumbnails_heights(user) -> List[int]:
+    capabilities = get_user_tier_capabilities(user)
+    return sorted(capabilities.allowed_thumbnails_heights) if capabilities else []
+
+
+def get_image_prefetches(user) -> List[Prefetch]:
+    '''
+    Nested lists of `ImageSerializer` filtered for the user, a page of images is serialized in a constant number of queries
+    '''
+    prefetches = [Prefetch('thumbnail_images', queryset=ThumbnailImage.objects.filter(height__in=get_allowed_thumbnails_heights(user)))]
+    capabilities = get_user_tier_capabilities(user)
+    if capabilities is None or capabilities.can_see_expiring_img:
+        prefetches.append(Prefetch('expiring_images', queryset=ExpiringImage.objects.filter(expiration_datetime__gt=timezone.now())))
+    return prefetches
+
+
+def is_prefetched(data, name: str) -> bool:
+    return not isinstance(data, Manager) or name in getattr(data.instance, '_prefetched_objects_cache', {})
+
+
 class ExpiringImageListSerializer(serializers.ListSerializer):
     def to_representation(self, data):
-        data = data.filter(expiration_datetime__gt=timezone.now())
+        # filtered by `get_image_prefetches` in lists
+        if not is_prefetched(data, self.source):
+            data = data.filter(expiration_datetime__gt=timezone.now())
         return super().to_representation(data)
 
 
@@ -53,12 +78,14 @@ class ExpiringImageBaseSerializer(serializers.ModelSerializer):
         return f"{get_host(self)}{obj.image_url}"
 
     def validate_image_id(self, image_id):
-        user = self.context['request'].user
-        try:
-            data = Image.objects.get(user=user, id=image_id)
-        except Image.DoesNotExist:
+        if 'image' in self.context:
+            # resolved by the view, `None` for images of other users
+            image = self.context['image']
+        else:
+            image = Image.objects.filter(user=self.context['request'].user, id=image_id).first()
+        if image is None or image.id != image_id:
             raise ValidationError("Image doesn't exist")
-        return data.id
+        return image.id
 
 
 class ExpiringImageCreateAndUpdateSerializer(ExpiringImageBaseSerializer):
@@ -83,11 +110,9 @@ class ExpiringImageNestedSerializer(ExpiringImageBaseSerializer):
 
 class ThumbnailsImageListSerializer(serializers.ListSerializer):
     def to_representation(self, data):
-        user = self.context.get('request').user
-        allowed_thumbnails_heights = []
-        if hasattr(user, 'useraccounttier'):
-            allowed_thumbnails_heights = user.useraccounttier.account_tier.allowed_thumbnails_heights
-        data = data.filter(height__in=allowed_thumbnails_heights)
+        # filtered by `get_image_prefetches` in lists
+        if not is_prefetched(data, self.source):
+            data = data.filter(height__in=get_allowed_thumbnails_heights(self.context.get('request').user))
         return super().to_representation(data)
 
 
@@ -97,31 +122,50 @@ class ThumbnailImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ThumbnailImage
         list_serializer_class = ThumbnailsImageListSerializer
-        fields = ('id', 'image_url', 'height', 'upload_datetime', 'update_datetime')
+        fields = ('id', 'image_url', 'height', 'width', 'format', 'size_bytes', 'upload_datetime', 'update_datetime')
 
     def get_image_url(self, obj):
         return f"{get_host(self)}{obj.image_url}"
 
 
+class ProbedImageField(serializers.ImageField):
+    '''
+    Checks the upload is an image by reading its header only, instead of opening and verifying the whole file with Pillow
+    '''
+
+    def to_internal_value(self, data):
+        file_object = serializers.FileField.to_internal_value(self, data)
+        try:
+            probe_image(file_object)
+        except PIL_Image.DecompressionBombError:
+            # refused by Pillow before the size is known, far above `MAX_IMAGE_PIXELS`
+            raise ValidationError(f"Image can have at most {settings.MAX_IMAGE_PIXELS} pixels.")
+        except (UnidentifiedImageError, OSError, SyntaxError, ValueError):
+            self.fail('invalid_image')
+        return file_object
+
+
 class ImageSerializer(serializers.ModelSerializer):
-    filename = serializers.ImageField(required=False,
-                                      validators=[
-                                          FileExtensionValidator(allowed_extensions=settings.ALLOWED_IMAGE_EXTENSIONS),
-                                          validate_image_min_height])
+    filename = ProbedImageField(required=False,
+                                validators=[
+                                    FileExtensionValidator(allowed_extensions=settings.ALLOWED_IMAGE_EXTENSIONS),
+                                    validate_image_max_pixels,
+                                    validate_image_min_height])
     image_url = serializers.SerializerMethodField(read_only=True)
     thumbnail_images = ThumbnailImageSerializer(read_only=True, many=True)
     expiring_images = ExpiringImageNestedSerializer(read_only=True, many=True, required=False)
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        user = kwargs['context']['request'].user
-        user_has_account_tier = hasattr(user, 'useraccounttier')
-        if user_has_account_tier and not user.useraccounttier.account_tier.can_see_expiring_img():
+        capabilities = get_user_tier_capabilities(kwargs['context']['request'].user)
+        if capabilities and not capabilities.can_see_expiring_img:
             self.fields.pop('expiring_images')
 
     class Meta:
         model = Image
-        fields = ['id', 'filename', 'image_url', 'upload_datetime', 'update_datetime', 'thumbnail_images', 'expiring_images']
+        fields = ['id', 'filename', 'image_url', 'width', 'height', 'format', 'size_bytes', 'placeholder', 'upload_datetime',
+                  'update_datetime', 'thumbnails_status', 'thumbnail_images', 'expiring_images']
+        read_only_fields = ['width', 'height', 'format', 'size_bytes', 'placeholder', 'thumbnails_status']
 
     def get_fields(self, *args, **kwargs):
         fields = super(ImageSerializer, self).get_fields(*args, **kwargs)
@@ -135,9 +179,9 @@ class ImageSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        user = self.context['request'].user
+        capabilities = get_user_tier_capabilities(self.context['request'].user)
         data.pop('filename')
-        if hasattr(user, 'useraccounttier') and user.useraccounttier.account_tier.can_see_original_img():
+        if capabilities and capabilities.can_see_original_img:
             return data
         data.pop('image_url')
         return data
@@ -1,12 +1,14 @@
 import os
 import shutil
 import pytest
+from rest_framework import status
 from rest_framework.test import APIClient
 from django.contrib.auth.models import User
 from django.conf import settings
+from django.core.cache import cache
 from django.urls import reverse
 from django.test import Client
-from .config import BASIC_IMAGE_ID, PREMIUM_IMAGE_ID, ENTERPRISE_IMAGE_ID, IMAGE_PARK_WITH_ROAD
+from .config import BASIC_IMAGE_ID, PREMIUM_IMAGE_ID, ENTERPRISE_IMAGE_ID, IMAGE_FOREST, IMAGE_PARK_WITH_ROAD
 from ...models import Image, ExpiringImage
 
 
@@ -18,6 +20,14 @@ def cleanup_media_root(request):
         shutil.rmtree(media_root)
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # cached records would outlive the rows rolled back after every test
+    cache.clear()
+    yield
+    cache.clear()
+
+
 @pytest.fixture
 def create_test_expiring_image():
     expiring_image = ExpiringImage.objects.create(image=Image(id=ENTERPRISE_IMAGE_ID), expire_after=3500)
@@ -38,6 +48,13 @@ def copy_enterprise_image():
     yield
 
 
+def upload_image(authenticated_client, images_url, image_path: str = IMAGE_FOREST):
+    with open(image_path, 'rb') as fp:
+        response = authenticated_client.post(images_url, format='multipart', data=dict(filename=fp))
+    assert response.status_code == status.HTTP_201_CREATED
+    return Image.objects.get(id=response.json()['id'])
+
+
 @pytest.fixture
 def client():
     c = Client()
@@ -1,19 +1,29 @@
 from pytest_schema import schema, And
 from ..config import BASIC_ALLOWED_THUMBNAIL_HEIGHTS, PREMIUM_ALLOWED_THUMBNAIL_HEIGHTS, ENTERPRISE_ALLOWED_THUMBNAIL_HEIGHTS
-from .config import SCHEMA_ID_REGEX, SCHEMA_DATETIME_REGEX, SCHEMA_IMG_URL_REGEX, SCHEMA_THUMB_URL_REGEX
+from .config import (SCHEMA_ID_REGEX, SCHEMA_DATETIME_REGEX, SCHEMA_IMG_URL_REGEX, SCHEMA_THUMB_URL_REGEX, SCHEMA_THUMBNAILS_STATUS,
+                     SCHEMA_OPTIONAL_INT, SCHEMA_IMAGE_FORMAT, SCHEMA_PLACEHOLDER)
 from .expiring_image_details import EXPIRING_IMAGE_DETAILS_ENTERPRISE_SCHEMA
 
 
 IMAGE_DETAILS_BASIC_SCHEMA = schema(
     {
         "id": SCHEMA_ID_REGEX,
+        "width": SCHEMA_OPTIONAL_INT,
+        "height": SCHEMA_OPTIONAL_INT,
+        "format": SCHEMA_IMAGE_FORMAT,
+        "size_bytes": SCHEMA_OPTIONAL_INT,
+        "placeholder": SCHEMA_PLACEHOLDER,
         "upload_datetime": SCHEMA_DATETIME_REGEX,
         "update_datetime": SCHEMA_DATETIME_REGEX,
+        "thumbnails_status": SCHEMA_THUMBNAILS_STATUS,
         "thumbnail_images": And([
             {
                 "id": SCHEMA_ID_REGEX,
                 "image_url": SCHEMA_THUMB_URL_REGEX,
                 "height": And(int, lambda height: height in BASIC_ALLOWED_THUMBNAIL_HEIGHTS),
+                "width": SCHEMA_OPTIONAL_INT,
+                "format": SCHEMA_IMAGE_FORMAT,
+                "size_bytes": SCHEMA_OPTIONAL_INT,
                 "upload_datetime": SCHEMA_DATETIME_REGEX,
                 "update_datetime": SCHEMA_DATETIME_REGEX
             }
@@ -26,13 +36,22 @@ IMAGE_DETAILS_PREMIUM_SCHEMA = schema(
     {
         "id": SCHEMA_ID_REGEX,
         "image_url": SCHEMA_IMG_URL_REGEX,
+        "width": SCHEMA_OPTIONAL_INT,
+        "height": SCHEMA_OPTIONAL_INT,
+        "format": SCHEMA_IMAGE_FORMAT,
+        "size_bytes": SCHEMA_OPTIONAL_INT,
+        "placeholder": SCHEMA_PLACEHOLDER,
         "upload_datetime": SCHEMA_DATETIME_REGEX,
         "update_datetime": SCHEMA_DATETIME_REGEX,
+        "thumbnails_status": SCHEMA_THUMBNAILS_STATUS,
         "thumbnail_images": And([
             {
                 "id": SCHEMA_ID_REGEX,
                 "image_url": SCHEMA_THUMB_URL_REGEX,
                 "height": And(int, lambda height: height in PREMIUM_ALLOWED_THUMBNAIL_HEIGHTS),
+                "width": SCHEMA_OPTIONAL_INT,
+                "format": SCHEMA_IMAGE_FORMAT,
+                "size_bytes": SCHEMA_OPTIONAL_INT,
                 "upload_datetime": SCHEMA_DATETIME_REGEX,
                 "update_datetime": SCHEMA_DATETIME_REGEX
             }
@@ -45,13 +64,22 @@ IMAGE_DETAILS_ENTERPRISE_SCHEMA = schema(
     {
         "id": SCHEMA_ID_REGEX,
         "image_url": SCHEMA_IMG_URL_REGEX,
+        "width": SCHEMA_OPTIONAL_INT,
+        "height": SCHEMA_OPTIONAL_INT,
+        "format": SCHEMA_IMAGE_FORMAT,
+        "size_bytes": SCHEMA_OPTIONAL_INT,
+        "placeholder": SCHEMA_PLACEHOLDER,
         "upload_datetime": SCHEMA_DATETIME_REGEX,
         "update_datetime": SCHEMA_DATETIME_REGEX,
+        "thumbnails_status": SCHEMA_THUMBNAILS_STATUS,
         "thumbnail_images": And([
             {
                 "id": SCHEMA_ID_REGEX,
                 "image_url": SCHEMA_THUMB_URL_REGEX,
                 "height": And(int, lambda height: height in ENTERPRISE_ALLOWED_THUMBNAIL_HEIGHTS),
+                "width": SCHEMA_OPTIONAL_INT,
+                "format": SCHEMA_IMAGE_FORMAT,
+                "size_bytes": SCHEMA_OPTIONAL_INT,
                 "upload_datetime": SCHEMA_DATETIME_REGEX,
                 "update_datetime": SCHEMA_DATETIME_REGEX
             }
@@ -0,0 +1,92 @@
+from io import BytesIO
+import pytest
+from PIL import Image as PIL_Image
+from asgiref.sync import async_to_sync
+from django.http import Http404
+from django.test import AsyncRequestFactory
+from rest_framework import status
+from imagesservice import async_views
+from imagesservice.config import RANGE_CHUNK_SIZE, UPGRADE_ACCOUNT_TIER_MESSAGE
+from .config import BASIC_IMAGE_ID, BASIC_THUMBNAIL_IMAGE_400_ID, ENTERPRISE_IMAGE_ID, PREMIUM_EXPIRING_IMAGE_ID
+from .test_resized_images import resizable_image  # noqa: F401 fixture
+
+
+async def read_streaming_content(response) -> bytes:
+    return b''.join([chunk async for chunk in response.streaming_content])
+
+
+def get(view, headers=None, **kwargs):
+    '''
+    Response of the async view and its content read the way an ASGI server does
+    '''
+    async def get_response():
+        request = AsyncRequestFactory().get('/', headers=headers)
+        response = await view(request, **kwargs)
+        content = await read_streaming_content(response) if response.streaming else response.content
+        return response, content
+    return async_to_sync(get_response)()
+
+
+@pytest.mark.django_db
+class TestAsyncServeViews:
+
+    def test_image(self, copy_enterprise_image):
+        response, content = get(async_views.serve_image, image_id=ENTERPRISE_IMAGE_ID)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.is_async
+        assert content[:2] == b'\xff\xd8'
+        assert int(response['Content-Length']) == len(content)
+
+    def test_image_read_in_large_chunks(self, copy_enterprise_image):
+        async def get_chunk_sizes():
+            response = await async_views.serve_image(AsyncRequestFactory().get('/'), image_id=ENTERPRISE_IMAGE_ID)
+            return [len(chunk) async for chunk in response.streaming_content]
+        chunk_sizes = async_to_sync(get_chunk_sizes)()
+        assert chunk_sizes[0] == min(RANGE_CHUNK_SIZE, sum(chunk_sizes))
+        assert len(chunk_sizes) == -(-sum(chunk_sizes) // RANGE_CHUNK_SIZE)
+
+    def test_image_access_forbidden(self):
+        response, content = get(async_views.serve_image, image_id=BASIC_IMAGE_ID)
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert content == bytes(UPGRADE_ACCOUNT_TIER_MESSAGE, "utf-8")
+
+    def test_image_not_found(self):
+        with pytest.raises(Http404):
+            get(async_views.serve_image, image_id=PREMIUM_EXPIRING_IMAGE_ID)
+
+    def test_range(self, copy_enterprise_image):
+        _, whole = get(async_views.serve_image, image_id=ENTERPRISE_IMAGE_ID)
+        response, content = get(async_views.serve_image, headers={'Range': 'bytes=10-19'}, image_id=ENTERPRISE_IMAGE_ID)
+        assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+        assert content == whole[10:20]
+
+    def test_not_modified(self, copy_enterprise_image):
+        response, _ = get(async_views.serve_image, image_id=ENTERPRISE_IMAGE_ID)
+        response, content = get(async_views.serve_image, headers={'If-None-Match': response['ETag']}, image_id=ENTERPRISE_IMAGE_ID)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert content == b''
+
+    def test_resized_image(self, resizable_image):  # noqa: F811
+        response, content = get(async_views.serve_resized_image, image_id=resizable_image.id, height='5000')
+        assert response.status_code == status.HTTP_200_OK
+        with PIL_Image.open(BytesIO(content)) as image:
+            assert image.height == 300
+
+    def test_thumbnail_access_forbidden(self):
+        response, _ = get(async_views.serve_thumbnail_image, image_id=BASIC_THUMBNAIL_IMAGE_400_ID)
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_temp_image(self, copy_enterprise_image, create_test_expiring_image):
+        response, content = get(async_views.serve_temp_image, image_id=create_test_expiring_image.id)
+        assert response.status_code == status.HTTP_200_OK
+        assert 0 < int(response['Cache-Control'].split('max-age=')[1]) <= create_test_expiring_image.expire_after
+        assert content
+
+    def test_signed_temp_image(self, copy_enterprise_image, create_test_expiring_image, settings):
+        settings.SIGNED_EXPIRING_LINKS = True
+        settings.EXPIRING_LINK_SIGNING_KEYS = ['current-key']
+        token = create_test_expiring_image.image_url.split('/')[-2]
+
+        response, content = get(async_views.serve_signed_temp_image, token=token)
+        assert response.status_code == status.HTTP_200_OK
+        assert content
@@ -0,0 +1,63 @@
+import json
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from imagesservice.management.commands import backfill_thumbnails
+from .config import ENTERPRISE_IMAGE_ID
+from ...models import AccountTier, ThumbnailImage, ThumbnailSize
+
+
+@pytest.fixture
+def enterprise_extra_size():
+    thumbnail_size = ThumbnailSize.objects.create(height=300)
+    thumbnail_size.tiers.add(AccountTier.objects.get(name="Enterprise"))
+    return thumbnail_size
+
+
+@pytest.mark.django_db
+class TestBackfillThumbnails:
+
+    def test_renders_missing_sizes(self, copy_enterprise_image, enterprise_extra_size, tmp_path):
+        checkpoint = tmp_path / 'checkpoint.json'
+        call_command('backfill_thumbnails', '--batch-size', '2', '--checkpoint', str(checkpoint))
+        thumbnail_image = ThumbnailImage.objects.get(image_id=ENTERPRISE_IMAGE_ID, height=enterprise_extra_size.height)
+        assert thumbnail_image.is_rendered
+        assert not checkpoint.exists()
+
+    def test_resumes_after_checkpoint(self, copy_enterprise_image, enterprise_extra_size, tmp_path):
+        checkpoint = tmp_path / 'checkpoint.json'
+        checkpoint.write_text(json.dumps({'last_image_id': ENTERPRISE_IMAGE_ID, 'images': 3, 'thumbnails': 0, 'failed': 0}))
+        call_command('backfill_thumbnails', '--checkpoint', str(checkpoint))
+        assert not ThumbnailImage.objects.filter(image_id=ENTERPRISE_IMAGE_ID, height=enterprise_extra_size.height).exists()
+
+        call_command('backfill_thumbnails', '--checkpoint', str(checkpoint), '--restart')
+        assert ThumbnailImage.objects.filter(image_id=ENTERPRISE_IMAGE_ID, height=enterprise_extra_size.height).exists()
+
+    def test_failed_images_are_retried(self, copy_enterprise_image, enterprise_extra_size, tmp_path, monkeypatch):
+        checkpoint = tmp_path / 'checkpoint.json'
+        render_thumbnails = backfill_thumbnails.render_thumbnails
+
+        def fail(*args):
+            raise OSError("broken")
+        monkeypatch.setattr(backfill_thumbnails, 'render_thumbnails', fail)
+        with pytest.raises(CommandError):
+            call_command('backfill_thumbnails', '--checkpoint', str(checkpoint))
+        assert json.loads(checkpoint.read_text())['failed_image_ids'] == [ENTERPRISE_IMAGE_ID]
+
+        monkeypatch.setattr(backfill_thumbnails, 'render_thumbnails', render_thumbnails)
+        call_command('backfill_thumbnails', '--checkpoint', str(checkpoint))
+        assert ThumbnailImage.objects.get(image_id=ENTERPRISE_IMAGE_ID, height=enterprise_extra_size.height).is_rendered
+        assert not checkpoint.exists()
+
+    def test_failure_is_retried_in_the_same_run(self, copy_enterprise_image, enterprise_extra_size, tmp_path, monkeypatch):
+        render_thumbnails = backfill_thumbnails.render_thumbnails
+        calls = []
+
+        def fail_once(*args):
+            calls.append(args)
+            if len(calls) == 1:
+                raise OSError("broken")
+            return render_thumbnails(*args)
+        monkeypatch.setattr(backfill_thumbnails, 'render_thumbnails', fail_once)
+        call_command('backfill_thumbnails', '--checkpoint', str(tmp_path / 'checkpoint.json'))
+        assert ThumbnailImage.objects.get(image_id=ENTERPRISE_IMAGE_ID, height=enterprise_extra_size.height).is_rendered
@@ -0,0 +1,37 @@
+import pytest
+from imagesservice import cached_settings
+from .config import ENTERPRISE_ALLOWED_THUMBNAIL_HEIGHTS
+from ...models import ThumbnailSize
+
+
+@pytest.mark.django_db
+class TestCachedSettings:
+
+    def test_value_is_cached(self):
+        loads = []
+        assert cached_settings.get('test', lambda: loads.append(1)) is None
+        assert cached_settings.get('test', lambda: loads.append(1)) is None
+        assert loads == [1]
+
+    def test_max_height_is_cached(self, django_assert_num_queries):
+        max_height = max(ENTERPRISE_ALLOWED_THUMBNAIL_HEIGHTS)
+        assert ThumbnailSize.objects.get_max_height() == max_height
+        with django_assert_num_queries(0):
+            assert ThumbnailSize.objects.get_max_height() == max_height
+
+    def test_max_height_is_written_through(self, django_capture_on_commit_callbacks, django_assert_num_queries):
+        ThumbnailSize.objects.get_max_height()
+        with django_capture_on_commit_callbacks(execute=True):
+            thumbnail_size = ThumbnailSize.objects.create(height=5000)
+        with django_assert_num_queries(0):
+            assert ThumbnailSize.objects.get_max_height() == 5000
+
+        with django_capture_on_commit_callbacks(execute=True):
+            thumbnail_size.delete()
+        with django_assert_num_queries(0):
+            assert ThumbnailSize.objects.get_max_height() == max(ENTERPRISE_ALLOWED_THUMBNAIL_HEIGHTS)
+
+    def test_max_height_without_commit(self):
+        ThumbnailSize.objects.get_max_height()
+        ThumbnailSize.objects.create(height=5000)
+        assert ThumbnailSize.objects.get_max_height() == 5000
@@ -0,0 +1,41 @@
+import pytest
+from django.utils.cache import get_max_age
+from rest_framework import status
+from .conftest import upload_image
+
+
+@pytest.mark.django_db
+class TestConditionalRequests:
+
+    def test_validators_and_cache_control(self, client, authenticated_client__premium_account, images_url, settings):
+        image = upload_image(authenticated_client__premium_account, images_url)
+
+        response = client.get(image.image_url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.has_header('ETag')
+        assert response.has_header('Last-Modified')
+        assert 'public' in response['Cache-Control']
+        assert get_max_age(response) == settings.IMAGE_CACHE_MAX_AGE
+
+    @pytest.mark.parametrize('validator_header, request_header', [('ETag', 'HTTP_IF_NONE_MATCH'), ('Last-Modified', 'HTTP_IF_MODIFIED_SINCE')])
+    def test_not_modified(self, client, authenticated_client__premium_account, images_url, validator_header, request_header):
+        image = upload_image(authenticated_client__premium_account, images_url)
+        thumbnail_url = image.thumbnail_images.first().image_url
+        response = client.get(thumbnail_url)
+
+        response = client.get(thumbnail_url, **{request_header: response[validator_header]})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b''
+        assert response.has_header('Cache-Control')
+
+    def test_changed_file_is_sent_again(self, client, authenticated_client__premium_account, images_url):
+        image = upload_image(authenticated_client__premium_account, images_url)
+
+        response = client.get(image.image_url, HTTP_IF_NONE_MATCH='"0-0"')
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_expiring_image_is_cached_until_it_expires(self, client, copy_enterprise_image, create_test_expiring_image):
+        response = client.get(create_test_expiring_image.image_url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert 3400 < get_max_age(response) <= create_test_expiring_image.expire_after
@@ -0,0 +1,37 @@
+import pytest
+from django.core.files.storage import default_storage
+from imagesservice import rendering
+from .conftest import upload_image
+
+
+@pytest.mark.django_db
+class TestDeduplication:
+
+    def test_duplicate_shares_files(self, authenticated_client__premium_account, authenticated_client__basic_account, images_url, monkeypatch):
+        image = upload_image(authenticated_client__premium_account, images_url)
+
+        renders = []
+        render_thumbnails = rendering.render_thumbnails
+        monkeypatch.setattr('imagesservice.models.render_thumbnails', lambda *args: renders.append(args) or render_thumbnails(*args))
+        duplicate = upload_image(authenticated_client__basic_account, images_url)
+
+        assert duplicate.content_hash == image.content_hash
+        assert duplicate.filename.name == image.filename.name
+        thumbnails_files = dict(image.thumbnail_images.values_list('height', 'filename'))
+        for thumbnail in duplicate.thumbnail_images.all():
+            assert thumbnail.filename.name == thumbnails_files[thumbnail.height]
+        assert renders == []
+
+    def test_shared_file_is_deleted_with_last_reference(self, authenticated_client__premium_account, authenticated_client__enterprise_account,
+                                                        images_url, django_capture_on_commit_callbacks):
+        image = upload_image(authenticated_client__premium_account, images_url)
+        duplicate = upload_image(authenticated_client__enterprise_account, images_url)
+        shared_files = [image.filename.name] + [thumbnail.filename.name for thumbnail in image.thumbnail_images.all()]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            image.delete()
+        assert all(default_storage.exists(name) for name in shared_files)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            duplicate.delete()
+        assert not any(default_storage.exists(name) for name in shared_files)
@@ -0,0 +1,45 @@
+from io import StringIO
+import pytest
+from PIL import Image as PIL_Image
+from django.core.management import call_command
+from .config import IMAGE_PARK
+from .conftest import upload_image
+from ...models import AccountTier, EncoderProfile, ThumbnailSize
+
+
+@pytest.fixture
+def premium_tier():
+    return AccountTier.objects.get(name="Premium")
+
+
+@pytest.fixture
+def progressive_profile(premium_tier):
+    encoder_profile = EncoderProfile.objects.create(name="progressive", quality=40, progressive=True, optimize=True)
+    premium_tier.encoder_profile = encoder_profile
+    premium_tier.save()
+    return encoder_profile
+
+
+@pytest.mark.django_db
+class TestEncoderProfiles:
+
+    def test_size_profile_overrides_tier_profile(self, premium_tier, progressive_profile):
+        size_profile = EncoderProfile.objects.create(name="size", quality=90)
+        ThumbnailSize.objects.filter(height=400).update(encoder_profile=size_profile)
+        encoder_profiles = premium_tier.get_encoder_profiles([200, 400])
+        assert encoder_profiles[200] == progressive_profile.as_options()
+        assert encoder_profiles[400] == size_profile.as_options()
+
+    def test_no_profiles(self):
+        assert AccountTier.objects.get(name="Basic").get_encoder_profiles([200]) == {}
+
+    def test_thumbnails_are_encoded_with_profile(self, progressive_profile, authenticated_client__premium_account, images_url):
+        for thumbnail in upload_image(authenticated_client__premium_account, images_url, IMAGE_PARK).thumbnail_images.all():
+            with PIL_Image.open(thumbnail.filename.path) as thumbnail_file:
+                assert thumbnail_file.info.get('progressive')
+
+    def test_report(self, progressive_profile, authenticated_client__premium_account, images_url):
+        upload_image(authenticated_client__premium_account, images_url, IMAGE_PARK)
+        output = StringIO()
+        call_command('thumbnail_encoding_report', '--tier', 'Premium', stdout=output)
+        assert 'Premium' in output.getvalue()
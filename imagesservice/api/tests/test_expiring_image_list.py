@@ -2,7 +2,9 @@ import pytest
 from pytest_drf import APIViewTest, UsesGetMethod, UsesPostMethod, Returns403
 from rest_framework import status
 from django.urls import reverse
-from imagesservice.models import ExpiringImage
+from imagesservice.models import ExpiringImage, Image
+from imagesservice.api.tests.config import ENTERPRISE_IMAGE_ID
+from imagesservice.api.tests.test_images_list import get_cursor_pages
 from imagesservice.api.tests.schemas.expiring_images_list import EXPIRING_IMAGES_LIST_ENTERPRISE_SCHEMA
 from imagesservice.config import EXPIRE_AFTER_MIN, EXPIRE_AFTER_MAX
 
@@ -29,6 +31,23 @@ class TestPostNotAuthenticated(
         return enterprise_expiring_image_list_url
 
 
+@pytest.mark.django_db
+class TestGetExpiringImageListCursorPagination:
+
+    def test_pages(self, authenticated_client__enterprise_account, enterprise_expiring_image_list_url):
+        image = Image.objects.get(id=ENTERPRISE_IMAGE_ID)
+        for expire_after in [EXPIRE_AFTER_MIN, EXPIRE_AFTER_MIN, EXPIRE_AFTER_MAX, EXPIRE_AFTER_MIN, EXPIRE_AFTER_MAX]:
+            ExpiringImage.objects.create(image=image, expire_after=expire_after)
+        expiring_images = [
+            str(expiring_image_id) for expiring_image_id in ExpiringImage.objects.active().filter(image=image)
+            .order_by('-expiration_datetime', '-creation_datetime', '-id').values_list('id', flat=True)
+        ]
+
+        pages, _ = get_cursor_pages(authenticated_client__enterprise_account, f"{enterprise_expiring_image_list_url}?pagination=cursor&page_size=2")
+        assert sum(pages, []) == expiring_images
+        assert all(len(page) <= 2 for page in pages)
+
+
 @pytest.mark.django_db
 class TestGetExpiringImageList:
 
@@ -50,6 +69,32 @@ class TestGetExpiringImageList:
         assert EXPIRING_IMAGES_LIST_ENTERPRISE_SCHEMA.validate(response_json)
 
 
+@pytest.mark.django_db
+class TestExpiringImageQueries:
+
+    def test_list(self, authenticated_client__enterprise_account, enterprise_expiring_image_list_url, create_test_expiring_image,
+                  django_assert_num_queries):
+        # the forced user of the client keeps its account tier loaded by the first request
+        authenticated_client__enterprise_account.get(enterprise_expiring_image_list_url, format='json')
+        # count and page, the owner of the image is checked by the same queries
+        with django_assert_num_queries(2):
+            response = authenticated_client__enterprise_account.get(enterprise_expiring_image_list_url, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['count'] == 1
+
+    def test_list_of_image_from_other_account(self, authenticated_client__enterprise_account, basic_expiring_image_list_url):
+        response = authenticated_client__enterprise_account.get(basic_expiring_image_list_url, format='json')
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_create(self, authenticated_client__enterprise_account, enterprise_expiring_image_list_url, django_assert_num_queries):
+        authenticated_client__enterprise_account.get(enterprise_expiring_image_list_url, format='json')
+        # the image, checked once for the view and the serializer, and the insert
+        with django_assert_num_queries(2):
+            response = authenticated_client__enterprise_account.post(enterprise_expiring_image_list_url, format='json',
+                                                                     data={'expire_after': EXPIRE_AFTER_MIN})
+        assert response.status_code == status.HTTP_201_CREATED
+
+
 @pytest.mark.django_db
 class TestPostExpiringImage:
 
@@ -0,0 +1,40 @@
+import os
+import pytest
+from rest_framework import status
+from .conftest import upload_image
+from ...config import FILE_DELIVERY_X_ACCEL
+
+
+@pytest.fixture
+def x_accel_delivery(settings):
+    settings.FILE_DELIVERY_BACKEND = FILE_DELIVERY_X_ACCEL
+
+
+@pytest.mark.django_db
+class TestFileDelivery:
+
+    def test_x_accel_redirect(self, client, authenticated_client__premium_account, images_url, x_accel_delivery):
+        image = upload_image(authenticated_client__premium_account, images_url)
+        thumbnail_image = image.thumbnail_images.first()
+
+        response = client.get(thumbnail_image.image_url, HTTP_ACCEPT='image/jpeg')
+        assert response.status_code == status.HTTP_200_OK
+        assert response['X-Accel-Redirect'] == f"/protected-media/{thumbnail_image.filename.name}"
+        assert response['Content-Type'] == 'image/jpeg'
+        assert response.content == b''
+
+    def test_x_accel_redirect_of_missing_file(self, client, authenticated_client__premium_account, images_url, x_accel_delivery):
+        image = upload_image(authenticated_client__premium_account, images_url)
+        os.remove(image.filename.path)
+
+        response = client.get(image.image_url)
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert not response.has_header('X-Accel-Redirect')
+
+    def test_file_response_by_default(self, client, authenticated_client__premium_account, images_url):
+        image = upload_image(authenticated_client__premium_account, images_url)
+
+        response = client.get(image.image_url)
+        assert response.status_code == status.HTTP_200_OK
+        assert not response.has_header('X-Accel-Redirect')
+        assert b''.join(response.streaming_content) == image.filename.read()
@@ -0,0 +1,38 @@
+import os
+import pytest
+from PIL import Image as PIL_Image
+from django.core.management import call_command
+from .config import ENTERPRISE_IMAGE_ID, IMAGE_FOREST, IMAGE_PARK_WITH_ROAD
+from .conftest import upload_image
+from ...models import Image
+
+
+@pytest.mark.django_db
+class TestImageMetadata:
+
+    def test_stored_at_upload(self, authenticated_client__premium_account, images_url):
+        image = upload_image(authenticated_client__premium_account, images_url)
+
+        with PIL_Image.open(IMAGE_FOREST) as original:
+            assert (image.width, image.height, image.format) == (*original.size, 'JPEG')
+        assert image.size_bytes == os.path.getsize(IMAGE_FOREST)
+        for thumbnail_image in image.thumbnail_images.all():
+            with PIL_Image.open(thumbnail_image.filename.path) as thumbnail:
+                assert (thumbnail_image.width, thumbnail_image.format) == (thumbnail.width, 'JPEG')
+            assert thumbnail_image.size_bytes == thumbnail_image.filename.size
+
+    def test_exposed_in_api(self, authenticated_client__premium_account, images_url):
+        image = upload_image(authenticated_client__premium_account, images_url)
+        response_json = authenticated_client__premium_account.get(f"{images_url}{image.id}/").json()
+
+        assert response_json['width'] == image.width
+        assert response_json['size_bytes'] == image.size_bytes
+        assert all(thumbnail['width'] and thumbnail['size_bytes'] for thumbnail in response_json['thumbnail_images'])
+
+    def test_backfill(self, copy_enterprise_image):
+        call_command('backfill_image_metadata', '--batch-size', '1')
+
+        image = Image.objects.get(id=ENTERPRISE_IMAGE_ID)
+        with PIL_Image.open(IMAGE_PARK_WITH_ROAD) as original:
+            assert (image.width, image.height, image.format) == (*original.size, 'JPEG')
+        assert image.size_bytes == os.path.getsize(IMAGE_PARK_WITH_ROAD)
@@ -0,0 +1,51 @@
+import pytest
+from base64 import b64decode
+from io import BytesIO
+from PIL import Image as PIL_Image
+from django.core.files import File
+from .config import IMAGE_PARK
+from .conftest import upload_image
+from ...config import IMAGE_PLACEHOLDER_SIZE, THUMBNAIL_GENERATION_LAZY
+
+
+def decode_placeholder(placeholder):
+    header, data = placeholder.split(',', 1)
+    assert header == 'data:image/jpeg;base64'
+    return PIL_Image.open(BytesIO(b64decode(data)))
+
+
+@pytest.mark.django_db
+class TestImagePlaceholders:
+
+    def test_rendered_with_thumbnails(self, authenticated_client__premium_account, images_url):
+        image = upload_image(authenticated_client__premium_account, images_url)
+
+        with decode_placeholder(image.placeholder) as placeholder:
+            assert max(placeholder.size) == IMAGE_PLACEHOLDER_SIZE
+
+    def test_listed_in_api(self, authenticated_client__premium_account, images_url):
+        image = upload_image(authenticated_client__premium_account, images_url)
+        response_json = authenticated_client__premium_account.get(images_url).json()
+
+        placeholders = {result['id']: result['placeholder'] for result in response_json['results']}
+        assert placeholders[str(image.id)] == image.placeholder
+
+    def test_rendered_with_first_lazy_thumbnail(self, authenticated_client__premium_account, images_url, client, settings):
+        settings.THUMBNAIL_GENERATION_MODE = THUMBNAIL_GENERATION_LAZY
+        image = upload_image(authenticated_client__premium_account, images_url)
+        assert image.placeholder == ''
+
+        client.get(image.thumbnail_images.first().image_url)
+        image.refresh_from_db()
+        assert image.placeholder.startswith('data:image/jpeg;base64,')
+
+    def test_rendered_again_for_replaced_file(self, authenticated_client__premium_account, images_url):
+        image = upload_image(authenticated_client__premium_account, images_url)
+        old_placeholder = image.placeholder
+
+        with open(IMAGE_PARK, 'rb') as fp:
+            image.filename = File(fp, name='park.jpg')
+            image.save()
+        image.refresh_from_db()
+        assert image.placeholder.startswith('data:image/jpeg;base64,')
+        assert image.placeholder != old_placeholder
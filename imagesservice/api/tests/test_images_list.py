@@ -1,11 +1,23 @@
+import os
+from base64 import b64encode
+from datetime import timedelta
+from io import BytesIO
+from urllib.parse import urlencode
 import pytest
+from PIL import Image as PIL_Image
+from PIL.ImageFile import ImageFile
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from pytest_drf import APIViewTest, UsesGetMethod, UsesPostMethod, Returns403
 from .schemas.images_list import IMAGES_LIST_BASIC_SCHEMA, IMAGES_LIST_PREMIUM_SCHEMA, IMAGES_LIST_ENTERPRISE_SCHEMA
 from .config import (IMAGE_PARK, IMAGE_TOO_SMALL, RANDOM_FILE, BASIC_ALLOWED_THUMBNAIL_HEIGHTS,
                      PREMIUM_ALLOWED_THUMBNAIL_HEIGHTS, ENTERPRISE_ALLOWED_THUMBNAIL_HEIGHTS)
-from ...models import Image
+from .conftest import upload_image
+from ...models import ExpiringImage, Image, ThumbnailImage
 
 
 class TestGetNotAuthenticated(
@@ -58,6 +70,89 @@ class TestGetImagesList:
         assert IMAGES_LIST_ENTERPRISE_SCHEMA.validate(response_json)
 
 
+def get_images_list(authenticated_client, images_url):
+    with CaptureQueriesContext(connection) as queries:
+        response = authenticated_client.get(images_url, format='json')
+    assert response.status_code == status.HTTP_200_OK
+    return response.json(), len(queries)
+
+
+@pytest.mark.django_db
+class TestGetImagesListQueries:
+
+    def test_constant_number_of_queries(self, authenticated_client__enterprise_account, images_url):
+        # the forced user of the client keeps its account tier loaded by the first request
+        get_images_list(authenticated_client__enterprise_account, images_url)
+        _, single_image_queries = get_images_list(authenticated_client__enterprise_account, images_url)
+        for _ in range(3):
+            image = upload_image(authenticated_client__enterprise_account, images_url)
+            ExpiringImage.objects.create(image=image, expire_after=3500)
+
+        response_json, queries = get_images_list(authenticated_client__enterprise_account, images_url)
+        assert response_json['count'] == 4
+        assert all(image['thumbnail_images'] and image['expiring_images'] for image in response_json['results'][:3])
+        assert queries == single_image_queries
+
+    def test_nested_lists_are_filtered(self, authenticated_client__enterprise_account, images_url):
+        image = upload_image(authenticated_client__enterprise_account, images_url)
+        ThumbnailImage.objects.create(image=image, height=123)
+        active = ExpiringImage.objects.create(image=image, expire_after=3500)
+        expired = ExpiringImage.objects.create(image=image, expire_after=3500)
+        ExpiringImage.objects.filter(id=expired.id).update(expiration_datetime=timezone.now() - timedelta(seconds=1))
+
+        response_json, _ = get_images_list(authenticated_client__enterprise_account, images_url)
+        image_json = next(result for result in response_json['results'] if result['id'] == str(image.id))
+        assert sorted(thumbnail['height'] for thumbnail in image_json['thumbnail_images']) == ENTERPRISE_ALLOWED_THUMBNAIL_HEIGHTS
+        assert [expiring_image['id'] for expiring_image in image_json['expiring_images']] == [str(active.id)]
+
+
+def get_cursor_pages(authenticated_client, url, link='next'):
+    '''
+    Ids on the pages of the cursor pagination, following the `link` of every page
+    '''
+    pages = []
+    while url:
+        response = authenticated_client.get(url, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        response_json = response.json()
+        assert 'count' not in response_json
+        pages.append([result['id'] for result in response_json['results']])
+        url = response_json[link]
+    return pages, response_json
+
+
+@pytest.mark.django_db
+class TestGetImagesListCursorPagination:
+
+    @pytest.fixture
+    def images(self):
+        user = User.objects.get(username="teste")
+        Image.objects.bulk_create(Image(user=user, filename=f"images/originals/{index}.jpg") for index in range(11))
+        # half of them uploaded at the same time, their order is decided by the id
+        upload_datetime = timezone.now()
+        Image.objects.filter(id__in=Image.objects.filter(user=user).values('id')[:6]).update(upload_datetime=upload_datetime)
+        return [str(image_id) for image_id in Image.objects.filter(user=user).order_by('-upload_datetime', '-id').values_list('id', flat=True)]
+
+    def test_pages(self, authenticated_client__enterprise_account, images_url, images):
+        pages, last_page = get_cursor_pages(authenticated_client__enterprise_account, f"{images_url}?pagination=cursor&page_size=4")
+        assert [len(page) for page in pages] == [4, 4, 4]
+        assert sum(pages, []) == images
+
+        previous_pages, _ = get_cursor_pages(authenticated_client__enterprise_account, last_page['previous'], link='previous')
+        assert previous_pages == pages[-2::-1]
+
+    def test_page_numbers_by_default(self, authenticated_client__enterprise_account, images_url, images):
+        response_json = authenticated_client__enterprise_account.get(f"{images_url}?page=2", format='json').json()
+        assert response_json['count'] == len(images)
+        assert [result['id'] for result in response_json['results']] == images[5:10]
+
+    @pytest.mark.parametrize('position', ['"1"', '["a", "b"]', '[1, 2, 3]'])
+    def test_invalid_cursor(self, authenticated_client__enterprise_account, images_url, position):
+        cursor = b64encode(urlencode({'p': position}).encode()).decode()
+        response = authenticated_client__enterprise_account.get(images_url, {'pagination': 'cursor', 'cursor': cursor}, format='json')
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
 @pytest.mark.django_db
 class TestPostImagesList:
 
@@ -83,6 +178,49 @@ class TestPostImagesList:
         assert response.status_code == status.HTTP_400_BAD_REQUEST
         assert response_json == {'filename': ['Image height must be at least 400 px, current have 113 px.']}
 
+    def test_basic_with_too_many_pixels(self, authenticated_client__basic_account, images_url, settings, monkeypatch):
+        settings.MAX_IMAGE_PIXELS = 1000
+        # rejected from the header, the pixels are never decoded
+        monkeypatch.setattr(ImageFile, 'load', lambda image: pytest.fail("the upload was decoded"))
+        with open(IMAGE_PARK, 'rb') as fp:
+            data = dict(filename=fp)
+            response = authenticated_client__basic_account.post(images_url, format='multipart', data=data)
+        response_json = response.json()
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response_json['filename'][0].startswith('Image can have at most 1000 pixels, current have ')
+
+    def test_basic_with_decompression_bomb(self, authenticated_client__basic_account, images_url, settings):
+        # a few kilobytes of PNG with 200 million pixels, above the limit of Pillow
+        upload = BytesIO()
+        PIL_Image.new('1', (20000, 10000)).save(upload, 'PNG')
+        upload.name = 'bomb.png'
+        upload.seek(0)
+        response = authenticated_client__basic_account.post(images_url, format='multipart', data=dict(filename=upload))
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json() == {'filename': [f"Image can have at most {settings.MAX_IMAGE_PIXELS} pixels."]}
+
+    def test_basic_with_truncated_image(self, authenticated_client__basic_account, images_url):
+        upload = BytesIO()
+        PIL_Image.frombytes('RGB', (600, 600), os.urandom(600 * 600 * 3)).save(upload, 'PNG')
+        upload = BytesIO(upload.getvalue()[:upload.tell() // 2])
+        upload.name = 'truncated.png'
+        response = authenticated_client__basic_account.post(images_url, format='multipart', data=dict(filename=upload))
+        response_json = response.json()
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response_json['thumbnails_status'] == Image.ThumbnailsStatus.FAILED
+        assert not ThumbnailImage.objects.filter(image_id=response_json['id']).rendered().exists()
+
+    def test_basic_upload_is_opened_once(self, authenticated_client__basic_account, images_url, monkeypatch):
+        opened = []
+        pil_open = PIL_Image.open
+        monkeypatch.setattr(PIL_Image, 'open', lambda fp, *args, **kwargs: opened.append(fp) or pil_open(fp, *args, **kwargs))
+        monkeypatch.setattr('imagesservice.models.render_thumbnails', lambda *args: {})
+        with open(IMAGE_PARK, 'rb') as fp:
+            data = dict(filename=fp)
+            response = authenticated_client__basic_account.post(images_url, format='multipart', data=data)
+        assert response.status_code == status.HTTP_201_CREATED
+        assert len(opened) == 1
+
     def test_basic_account(self, client, authenticated_client__basic_account, images_url):
         with open(IMAGE_PARK, 'rb') as fp:
             data = dict(filename=fp)
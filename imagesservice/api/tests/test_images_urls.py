@@ -1,7 +1,12 @@
 import pytest
+from django.core.cache import cache
+from django.core.files import File
 from django.urls import reverse
+from imagesservice import serve_cache
 from imagesservice.config import UPGRADE_ACCOUNT_TIER_MESSAGE
-from .config import BASIC_IMAGE_ID, BASIC_THUMBNAIL_IMAGE_400_ID, PREMIUM_EXPIRING_IMAGE_ID
+from .config import IMAGE_PARK, BASIC_IMAGE_ID, BASIC_THUMBNAIL_IMAGE_400_ID, ENTERPRISE_IMAGE_ID, PREMIUM_EXPIRING_IMAGE_ID
+from .conftest import upload_image
+from ...models import AccountTier, ExpiringImage, Image, ThumbnailSize
 from rest_framework import status
 
 
@@ -49,3 +54,119 @@ class TestThumbnailImageURLAccess:
         response = client.get(reverse('serve_thumbnail_image', kwargs={'image_id': BASIC_THUMBNAIL_IMAGE_400_ID}))
         assert response.status_code == status.HTTP_403_FORBIDDEN
         assert response.content == bytes(UPGRADE_ACCOUNT_TIER_MESSAGE, "utf-8")
+
+
+@pytest.mark.django_db
+class TestServeQueries:
+
+    def test_image(self, client, copy_enterprise_image, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = client.get(reverse('serve_image', kwargs={'image_id': ENTERPRISE_IMAGE_ID}))
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_thumbnail_image(self, client, authenticated_client__premium_account, images_url, django_assert_num_queries):
+        thumbnail_image = upload_image(authenticated_client__premium_account, images_url).thumbnail_images.first()
+        with django_assert_num_queries(1):
+            response = client.get(reverse('serve_thumbnail_image', kwargs={'image_id': thumbnail_image.id}))
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_forbidden_thumbnail_image(self, client, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = client.get(reverse('serve_thumbnail_image', kwargs={'image_id': BASIC_THUMBNAIL_IMAGE_400_ID}))
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_temp_image(self, client, copy_enterprise_image, create_test_expiring_image, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = client.get(reverse('serve_temp_image', kwargs={'image_id': create_test_expiring_image.id}))
+        assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+class TestServeCache:
+
+    @pytest.mark.parametrize('view_name', ['serve_image', 'serve_resized_image'])
+    def test_repeated_image_hits_skip_database(self, client, copy_enterprise_image, view_name, django_assert_num_queries):
+        kwargs = {'image_id': ENTERPRISE_IMAGE_ID, 'height': 200} if view_name == 'serve_resized_image' else {'image_id': ENTERPRISE_IMAGE_ID}
+        AccountTier.objects.filter(name="Enterprise").update(max_resize_height=300)
+        client.get(reverse(view_name, kwargs=kwargs))
+
+        with django_assert_num_queries(0):
+            response = client.get(reverse(view_name, kwargs=kwargs))
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_repeated_thumbnail_image_hits_skip_database(self, client, authenticated_client__premium_account, images_url,
+                                                         django_assert_num_queries):
+        thumbnail_image = upload_image(authenticated_client__premium_account, images_url).thumbnail_images.first()
+        client.get(thumbnail_image.image_url)
+
+        with django_assert_num_queries(0):
+            response = client.get(thumbnail_image.image_url)
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_repeated_temp_image_hits_skip_database(self, client, copy_enterprise_image, create_test_expiring_image,
+                                                    django_assert_num_queries):
+        client.get(create_test_expiring_image.image_url)
+
+        with django_assert_num_queries(0):
+            response = client.get(create_test_expiring_image.image_url)
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_unknown_id_is_cached(self, client, django_assert_num_queries):
+        client.get(reverse('serve_image', kwargs={'image_id': PREMIUM_EXPIRING_IMAGE_ID}))
+
+        with django_assert_num_queries(0):
+            response = client.get(reverse('serve_image', kwargs={'image_id': PREMIUM_EXPIRING_IMAGE_ID}))
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_invalidated_by_account_tier_change(self, client, copy_enterprise_image):
+        client.get(reverse('serve_image', kwargs={'image_id': ENTERPRISE_IMAGE_ID}))
+        account_tier = AccountTier.objects.get(name="Enterprise")
+        account_tier.enable_original_link = False
+        account_tier.save()
+
+        response = client.get(reverse('serve_image', kwargs={'image_id': ENTERPRISE_IMAGE_ID}))
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_invalidated_by_thumbnail_size_removal(self, client, authenticated_client__premium_account, images_url):
+        thumbnail_image = upload_image(authenticated_client__premium_account, images_url).thumbnail_images.get(height=400)
+        client.get(thumbnail_image.image_url)
+        ThumbnailSize.objects.get(height=400).tiers.remove(AccountTier.objects.get(name="Premium"))
+
+        response = client.get(thumbnail_image.image_url)
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_invalidated_by_expiring_image_delete(self, client, copy_enterprise_image, create_test_expiring_image):
+        client.get(create_test_expiring_image.image_url)
+        create_test_expiring_image.delete()
+
+        response = client.get(create_test_expiring_image.image_url)
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_invalidated_again_after_commit(self, django_capture_on_commit_callbacks):
+        image = Image.objects.get(id=ENTERPRISE_IMAGE_ID)
+        with django_capture_on_commit_callbacks(execute=True):
+            image.save()
+            # cached by a concurrent request from the rows before the commit
+            cache.set(serve_cache.get_record_key('image', image.id), {'path': 'stale'})
+        assert cache.get(serve_cache.get_record_key('image', image.id)) is None
+
+    def test_generation_bumped_again_after_commit(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            AccountTier.objects.get(name="Enterprise").save()
+            generation = serve_cache.get_generation()
+        assert serve_cache.get_generation() != generation
+
+    def test_temp_image_invalidated_by_replaced_original(self, client, authenticated_client__enterprise_account, images_url,
+                                                         django_capture_on_commit_callbacks):
+        image = upload_image(authenticated_client__enterprise_account, images_url)
+        expiring_image = ExpiringImage.objects.create(image=image, expire_after=3500)
+        client.get(expiring_image.image_url)
+
+        with django_capture_on_commit_callbacks(execute=True), open(IMAGE_PARK, 'rb') as fp:
+            image.filename = File(fp, name='park.jpg')
+            image.save()
+
+        response = client.get(expiring_image.image_url)
+        assert response.status_code == status.HTTP_200_OK
+        with open(IMAGE_PARK, 'rb') as fp:
+            assert b''.join(response.streaming_content) == fp.read()
@@ -0,0 +1,63 @@
+import threading
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from imagesservice import rendering
+from imagesservice.config import THUMBNAIL_GENERATION_LAZY
+from .config import IMAGE_PARK, PREMIUM_ALLOWED_THUMBNAIL_HEIGHTS
+from .conftest import upload_image
+
+
+@pytest.fixture
+def lazy_thumbnails(settings):
+    settings.THUMBNAIL_GENERATION_MODE = THUMBNAIL_GENERATION_LAZY
+
+
+@pytest.fixture
+def lazy_image(lazy_thumbnails, authenticated_client__premium_account, images_url):
+    return upload_image(authenticated_client__premium_account, images_url, IMAGE_PARK)
+
+
+@pytest.mark.django_db
+class TestLazyThumbnails:
+
+    def test_upload_creates_placeholders(self, lazy_image):
+        thumbnail_images = lazy_image.thumbnail_images.order_by('height')
+        assert [thumbnail.height for thumbnail in thumbnail_images] == PREMIUM_ALLOWED_THUMBNAIL_HEIGHTS
+        assert not any(thumbnail.is_rendered for thumbnail in thumbnail_images)
+
+    def test_first_request_renders_thumbnail_once(self, client, lazy_image, monkeypatch):
+        renders = []
+        render_thumbnails = rendering.render_thumbnails
+        monkeypatch.setattr('imagesservice.models.render_thumbnails', lambda *args: renders.append(args) or render_thumbnails(*args))
+
+        thumbnail = lazy_image.thumbnail_images.get(height=PREMIUM_ALLOWED_THUMBNAIL_HEIGHTS[0])
+        url = reverse('serve_thumbnail_image', kwargs={'image_id': str(thumbnail.id)})
+        assert client.get(url).status_code == status.HTTP_200_OK
+        assert client.get(url).status_code == status.HTTP_200_OK
+
+        thumbnail.refresh_from_db()
+        assert thumbnail.is_rendered
+        assert len(renders) == 1
+
+
+class TestCoalesceRenders:
+
+    def test_renders_of_same_key_run_one_at_a_time(self):
+        active, overlaps = [], []
+
+        def render():
+            with rendering.coalesce_renders('key'):
+                overlaps.append(len(active))
+                active.append(1)
+                threading.Event().wait(0.01)
+                active.pop()
+
+        threads = [threading.Thread(target=render) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert overlaps == [0] * 5
+        assert rendering._render_locks == {}
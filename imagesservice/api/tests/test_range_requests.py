@@ -0,0 +1,77 @@
+import pytest
+from rest_framework import status
+from .conftest import upload_image
+
+
+@pytest.fixture
+def original(authenticated_client__premium_account, images_url):
+    image = upload_image(authenticated_client__premium_account, images_url)
+    with open(image.filename.path, 'rb') as fp:
+        yield image, fp.read()
+
+
+@pytest.mark.django_db
+class TestRangeRequests:
+
+    def test_whole_file_advertises_ranges(self, client, original):
+        image, content = original
+        response = client.get(image.image_url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Accept-Ranges'] == 'bytes'
+
+    @pytest.mark.parametrize('range_header, first, last', [
+        ('bytes=0-99', 0, 99),
+        ('bytes=100-', 100, None),
+        ('bytes=-50', -50, None),
+        ('bytes=10-1000000000', 10, None),
+    ])
+    def test_single_range(self, client, original, range_header, first, last):
+        image, content = original
+        response = client.get(image.image_url, HTTP_RANGE=range_header)
+
+        expected = content[first:last + 1 if last is not None else None]
+        assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+        assert b''.join(response.streaming_content) == expected
+        assert int(response['Content-Length']) == len(expected)
+        assert response['Content-Range'].endswith(f"/{len(content)}")
+
+    def test_multiple_ranges(self, client, original):
+        image, content = original
+        response = client.get(image.image_url, HTTP_RANGE='bytes=0-9,20-29')
+
+        assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+        assert response['Content-Type'].startswith('multipart/byteranges; boundary=')
+        body = b''.join(response.streaming_content)
+        assert int(response['Content-Length']) == len(body)
+        boundary = response['Content-Type'].split('boundary=')[1].encode()
+        parts = body.split(b'--' + boundary)
+        assert parts[1].endswith(b'\r\n\r\n' + content[0:10] + b'\r\n')
+        assert f"Content-Range: bytes 20-29/{len(content)}".encode() in parts[2]
+        assert parts[2].endswith(b'\r\n\r\n' + content[20:30] + b'\r\n')
+        assert parts[3] == b'--\r\n'
+
+    def test_not_satisfiable(self, client, original):
+        image, content = original
+        response = client.get(image.image_url, HTTP_RANGE=f"bytes={len(content)}-")
+
+        assert response.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        assert response['Content-Range'] == f"bytes */{len(content)}"
+
+    @pytest.mark.parametrize('range_header', ['bytes=9-0', 'lines=0-10', 'bytes=a-b'])
+    def test_invalid_range_is_ignored(self, client, original, range_header):
+        image, content = original
+        response = client.get(image.image_url, HTTP_RANGE=range_header)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert b''.join(response.streaming_content) == content
+
+    def test_if_range(self, client, original):
+        image, content = original
+        etag = client.get(image.image_url)['ETag']
+
+        response = client.get(image.image_url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+
+        response = client.get(image.image_url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"0-0"')
+        assert response.status_code == status.HTTP_200_OK
+        assert b''.join(response.streaming_content) == content
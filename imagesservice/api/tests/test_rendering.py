@@ -0,0 +1,43 @@
+import pytest
+from PIL import Image as PIL_Image
+from imagesservice import rendering
+from .config import IMAGE_PARK, ENTERPRISE_ALLOWED_THUMBNAIL_HEIGHTS
+from .conftest import upload_image
+
+
+@pytest.fixture
+def render_workers(settings):
+    settings.THUMBNAIL_RENDER_WORKERS = 2
+    yield
+    rendering.reset_executor()
+
+
+class TestCascadeRendering:
+
+    def test_thumbnails_sizes(self, tmp_path):
+        destination_paths = {height: str(tmp_path / f"{height}.jpg") for height in (100, 400, 200)}
+        rendering.render_thumbnails_cascade(IMAGE_PARK, destination_paths)
+        with PIL_Image.open(IMAGE_PARK) as original_image:
+            original_size = original_image.size
+        for height, destination_path in destination_paths.items():
+            with PIL_Image.open(destination_path) as thumbnail_file:
+                assert thumbnail_file.size == rendering.get_thumbnail_size(original_size, height)
+
+
+@pytest.mark.django_db
+class TestParallelRendering:
+
+    def test_executor_is_reused(self, render_workers):
+        assert rendering.get_executor() is rendering.get_executor()
+
+    def test_executor_disabled(self, settings):
+        settings.THUMBNAIL_RENDER_WORKERS = 0
+        assert rendering.get_executor() is None
+
+    def test_enterprise_account(self, render_workers, authenticated_client__enterprise_account, images_url):
+        image = upload_image(authenticated_client__enterprise_account, images_url, IMAGE_PARK)
+        thumbnail_images = image.thumbnail_images.order_by('height')
+        assert [thumbnail.height for thumbnail in thumbnail_images] == ENTERPRISE_ALLOWED_THUMBNAIL_HEIGHTS
+        for thumbnail in thumbnail_images:
+            with PIL_Image.open(thumbnail.filename.path) as thumbnail_file:
+                assert thumbnail_file.height == thumbnail.height
@@ -0,0 +1,94 @@
+import os
+from io import BytesIO
+import pytest
+from PIL import Image as PIL_Image
+from django.urls import reverse
+from rest_framework import status
+from imagesservice import resize_cache
+from .config import IMAGE_PARK
+from .conftest import upload_image
+from ...config import UPGRADE_ACCOUNT_TIER_MESSAGE
+
+
+def get_resized_image_url(image, height):
+    return reverse('serve_resized_image', kwargs={'image_id': image.id, 'height': height})
+
+
+@pytest.fixture
+def resizable_image(authenticated_client__enterprise_account, images_url, settings):
+    settings.RESIZE_CACHE_MAX_BYTES = 10 * 1024 ** 2
+    resize_cache.evict(0)
+    image = upload_image(authenticated_client__enterprise_account, images_url)
+    account_tier = image.user.useraccounttier.account_tier
+    account_tier.min_resize_height = 50
+    account_tier.max_resize_height = 300
+    account_tier.save()
+    yield image
+    resize_cache.evict(0)
+
+
+def get_response_height(response):
+    with PIL_Image.open(BytesIO(b''.join(response.streaming_content))) as image:
+        return image.height
+
+
+@pytest.mark.django_db
+class TestResizedImages:
+
+    def test_tier_without_range(self, client, authenticated_client__basic_account, images_url):
+        image = upload_image(authenticated_client__basic_account, images_url, IMAGE_PARK)
+
+        response = client.get(get_resized_image_url(image, 120))
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert response.content.decode() == UPGRADE_ACCOUNT_TIER_MESSAGE
+
+    @pytest.mark.parametrize('requested_height, height', [(120, 120), (10, 50), (5000, 300)])
+    def test_height_is_clamped(self, client, resizable_image, requested_height, height):
+        response = client.get(get_resized_image_url(resizable_image, requested_height))
+        assert response.status_code == status.HTTP_200_OK
+        assert get_response_height(response) == height
+
+    def test_hits_and_misses(self, client, resizable_image):
+        stats = resize_cache.get_stats()
+
+        client.get(get_resized_image_url(resizable_image, 120))
+        client.get(get_resized_image_url(resizable_image, 120))
+        client.get(get_resized_image_url(resizable_image, 5000))
+
+        new_stats = resize_cache.get_stats()
+        assert new_stats['misses'] - stats['misses'] == 2
+        assert new_stats['hits'] - stats['hits'] == 1
+        assert new_stats['files'] == 2
+
+    def test_least_recently_used_is_evicted(self, client, resizable_image, settings):
+        client.get(get_resized_image_url(resizable_image, 100))
+        client.get(get_resized_image_url(resizable_image, 200))
+        cached_files = resize_cache.get_cached_files()
+        settings.RESIZE_CACHE_MAX_BYTES = sum(size for _, size, _ in cached_files)
+
+        # the 100 px image becomes the most recently used one
+        os.utime(cached_files[0][2], (0, 0))
+        os.utime(cached_files[1][2], (0, 0))
+        client.get(get_resized_image_url(resizable_image, 100))
+        client.get(get_resized_image_url(resizable_image, 150))
+
+        cached_paths = [path for _, _, path in resize_cache.get_cached_files()]
+        assert cached_paths == [
+            resize_cache.get_cache_path(resizable_image.filename.name, 100),
+            resize_cache.get_cache_path(resizable_image.filename.name, 150),
+        ]
+
+    def test_cache_is_listed_only_above_budget(self, client, resizable_image, monkeypatch, settings):
+        client.get(get_resized_image_url(resizable_image, 100))
+        listings = []
+        get_cached_files = resize_cache.get_cached_files
+        monkeypatch.setattr(resize_cache, 'get_cached_files', lambda: listings.append(1) or get_cached_files())
+
+        client.get(get_resized_image_url(resizable_image, 200))
+        assert not listings
+
+        # the tracked size of both images exceeds the budget
+        settings.RESIZE_CACHE_MAX_BYTES = 1
+        client.get(get_resized_image_url(resizable_image, 150))
+        assert listings
+        assert [path for _, _, path in get_cached_files()] == [resize_cache.get_cache_path(resizable_image.filename.name, 150)]
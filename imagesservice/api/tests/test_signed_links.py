@@ -0,0 +1,89 @@
+import pytest
+from datetime import timedelta
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import status
+
+
+@pytest.fixture
+def signed_links(settings):
+    settings.SIGNED_EXPIRING_LINKS = True
+    settings.EXPIRING_LINK_SIGNING_KEYS = ['current-key', 'previous-key']
+
+
+@pytest.mark.django_db
+class TestSignedLinks:
+
+    def test_signed_link(self, client, copy_enterprise_image, create_test_expiring_image, signed_links):
+        image_url = create_test_expiring_image.image_url
+        assert image_url.startswith('/img/temp/s/')
+
+        response = client.get(image_url)
+        assert response.status_code == status.HTTP_200_OK
+        assert 0 < int(response['Cache-Control'].split('max-age=')[1]) <= create_test_expiring_image.expire_after
+
+    def test_expired_link_is_rejected_without_lookups(self, client, copy_enterprise_image, create_test_expiring_image, signed_links,
+                                                      django_assert_num_queries):
+        create_test_expiring_image.expiration_datetime = timezone.now() - timedelta(seconds=1)
+
+        with django_assert_num_queries(0):
+            response = client.get(create_test_expiring_image.image_url)
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert response.content == b"Image expired"
+
+    def test_tampered_link(self, client, copy_enterprise_image, create_test_expiring_image, signed_links):
+        create_test_expiring_image.expiration_datetime += timedelta(days=1)
+        payload = create_test_expiring_image.image_url.split(':')[0]
+        create_test_expiring_image.expiration_datetime -= timedelta(days=1)
+        signature = create_test_expiring_image.image_url.split(':')[1]
+
+        response = client.get(f"{payload}:{signature}")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_key_rotation(self, client, copy_enterprise_image, create_test_expiring_image, signed_links, settings):
+        settings.EXPIRING_LINK_SIGNING_KEYS = ['previous-key']
+        image_url = create_test_expiring_image.image_url
+
+        settings.EXPIRING_LINK_SIGNING_KEYS = ['current-key', 'previous-key']
+        assert client.get(image_url).status_code == status.HTTP_200_OK
+
+        settings.EXPIRING_LINK_SIGNING_KEYS = ['next-key', 'current-key']
+        assert client.get(image_url).status_code == status.HTTP_404_NOT_FOUND
+
+    def test_revoked_by_delete(self, client, copy_enterprise_image, create_test_expiring_image, signed_links):
+        image_url = create_test_expiring_image.image_url
+        create_test_expiring_image.delete()
+
+        response = client.get(image_url)
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_revoked_by_update(self, client, copy_enterprise_image, create_test_expiring_image, signed_links):
+        previous_image_url = create_test_expiring_image.image_url
+        create_test_expiring_image.expire_after = 600
+        create_test_expiring_image.save()
+
+        assert client.get(previous_image_url).status_code == status.HTTP_404_NOT_FOUND
+        assert client.get(create_test_expiring_image.image_url).status_code == status.HTTP_200_OK
+
+    def test_revocation_outlives_cache(self, client, copy_enterprise_image, create_test_expiring_image, signed_links):
+        image_url = create_test_expiring_image.image_url
+        create_test_expiring_image.delete()
+        # e.g. evicted, restarted or written by another process
+        cache.clear()
+
+        assert client.get(image_url).status_code == status.HTTP_404_NOT_FOUND
+
+    def test_repeated_hits_skip_database(self, client, copy_enterprise_image, create_test_expiring_image, signed_links,
+                                         django_assert_num_queries):
+        client.get(create_test_expiring_image.image_url)
+
+        with django_assert_num_queries(0):
+            response = client.get(create_test_expiring_image.image_url)
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_cached_link_is_revoked(self, client, copy_enterprise_image, create_test_expiring_image, signed_links):
+        image_url = create_test_expiring_image.image_url
+        assert client.get(image_url).status_code == status.HTTP_200_OK
+        create_test_expiring_image.delete()
+
+        assert client.get(image_url).status_code == status.HTTP_404_NOT_FOUND
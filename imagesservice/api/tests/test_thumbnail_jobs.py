@@ -0,0 +1,75 @@
+from datetime import timedelta
+import pytest
+from django.core.files import File
+from django.core.management import call_command
+from django.utils import timezone
+from imagesservice.config import THUMBNAIL_GENERATION_QUEUED, THUMBNAIL_JOB_MAX_ATTEMPTS
+from .config import IMAGE_FOREST, IMAGE_PARK, PREMIUM_ALLOWED_THUMBNAIL_HEIGHTS
+from .conftest import upload_image
+from ...models import Image, ThumbnailJob
+
+
+@pytest.fixture
+def queued_thumbnails(settings):
+    settings.THUMBNAIL_GENERATION_MODE = THUMBNAIL_GENERATION_QUEUED
+
+
+@pytest.fixture
+def queued_image(queued_thumbnails, authenticated_client__premium_account, images_url):
+    return upload_image(authenticated_client__premium_account, images_url, IMAGE_PARK)
+
+
+def replace_file(image):
+    with open(IMAGE_FOREST, 'rb') as fp:
+        image.filename = File(fp, name='forest.jpg')
+        image.save()
+
+
+@pytest.mark.django_db
+class TestThumbnailJobs:
+
+    def test_upload_returns_pending_thumbnails(self, queued_image):
+        assert queued_image.thumbnails_status == Image.ThumbnailsStatus.PENDING
+        assert sorted(queued_image.thumbnail_images.values_list('height', flat=True)) == PREMIUM_ALLOWED_THUMBNAIL_HEIGHTS
+        assert not queued_image.thumbnail_images.rendered().exists()
+        assert queued_image.thumbnail_jobs.filter(status=ThumbnailJob.Status.PENDING).count() == 1
+
+    def test_worker_renders_pending_thumbnails(self, queued_image):
+        call_command('thumbnail_worker', '--once')
+        queued_image.refresh_from_db()
+        assert queued_image.thumbnails_status == Image.ThumbnailsStatus.READY
+        assert sorted(queued_image.thumbnail_images.rendered().values_list('height', flat=True)) == PREMIUM_ALLOWED_THUMBNAIL_HEIGHTS
+        assert queued_image.thumbnail_jobs.get().status == ThumbnailJob.Status.DONE
+
+    def test_failed_job_is_retried_later(self, queued_image, monkeypatch):
+        monkeypatch.setattr(Image, 'create_thumbnails', lambda image, heights: 1 / 0)
+        call_command('thumbnail_worker', '--once')
+        job = queued_image.thumbnail_jobs.get()
+        assert job.status == ThumbnailJob.Status.PENDING
+        assert job.attempts == 1
+        assert job.available_at > timezone.now()
+        assert 'ZeroDivisionError' in job.last_error
+
+    def test_job_fails_after_max_attempts(self, queued_image, monkeypatch):
+        monkeypatch.setattr(Image, 'create_thumbnails', lambda image, heights: 1 / 0)
+        queued_image.thumbnail_jobs.update(attempts=THUMBNAIL_JOB_MAX_ATTEMPTS - 1)
+        call_command('thumbnail_worker', '--once')
+        queued_image.refresh_from_db()
+        assert queued_image.thumbnail_jobs.get().status == ThumbnailJob.Status.FAILED
+        assert queued_image.thumbnails_status == Image.ThumbnailsStatus.FAILED
+
+    def test_running_job_is_claimed_again_after_visibility_timeout(self, queued_image):
+        queued_image.thumbnail_jobs.update(status=ThumbnailJob.Status.RUNNING, locked_until=timezone.now() + timedelta(minutes=1))
+        assert ThumbnailJob.objects.claim('worker') == []
+        queued_image.thumbnail_jobs.update(locked_until=timezone.now() - timedelta(seconds=1))
+        assert [job.image_id for job in ThumbnailJob.objects.claim('worker')] == [queued_image.id]
+
+    def test_replaced_again_with_two_waiting_jobs(self, queued_image):
+        # replaced while its job runs, then the running job fails and waits for a retry next to the new one
+        running_job, = ThumbnailJob.objects.claim('worker')
+        replace_file(queued_image)
+        running_job.mark_failed(ZeroDivisionError())
+        assert queued_image.thumbnail_jobs.filter(status=ThumbnailJob.Status.PENDING).count() == 2
+
+        replace_file(queued_image)
+        assert queued_image.thumbnail_jobs.filter(status=ThumbnailJob.Status.PENDING, attempts=0).count() == 2
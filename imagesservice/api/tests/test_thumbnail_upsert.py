@@ -0,0 +1,36 @@
+import pytest
+from django.core.files.storage import default_storage
+from .conftest import upload_image
+
+
+@pytest.mark.django_db
+class TestThumbnailUpsert:
+
+    def test_save_thumbnails_is_a_single_upsert(self, authenticated_client__premium_account, images_url, django_assert_num_queries):
+        image = upload_image(authenticated_client__premium_account, images_url)
+        heights = image.get_allowed_thumbnails_heights()
+        assert len(heights) > 1
+
+        paths = {height: f"images/thumb/upsert-{height}.jpg" for height in heights}
+        # the replaced filenames and the upsert, regardless of the number of heights
+        with django_assert_num_queries(2):
+            image.save_thumbnails(paths, {})
+
+        assert dict(image.thumbnail_images.values_list('height', 'filename')) == paths
+
+    def test_replaced_thumbnails_are_released(self, authenticated_client__premium_account, images_url, django_capture_on_commit_callbacks):
+        image = upload_image(authenticated_client__premium_account, images_url)
+        replaced_files = list(image.thumbnail_images.values_list('filename', flat=True))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            image.create_thumbnail_placeholders(image.get_allowed_thumbnails_heights())
+
+        assert image.thumbnail_images.rendered().count() == 0
+        assert not any(default_storage.exists(name) for name in replaced_files)
+
+    def test_unchanged_image_save_skips_lookup(self, authenticated_client__premium_account, images_url, django_assert_num_queries):
+        image = upload_image(authenticated_client__premium_account, images_url)
+        image.thumbnails_status = image.ThumbnailsStatus.FAILED
+
+        with django_assert_num_queries(1):
+            image.save()
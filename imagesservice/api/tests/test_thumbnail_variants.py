@@ -0,0 +1,45 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from imagesservice.utils import get_accepted_media_types
+from .config import IMAGE_PARK
+from .conftest import upload_image
+
+
+@pytest.fixture
+def thumbnail_image(authenticated_client__premium_account, images_url):
+    image = upload_image(authenticated_client__premium_account, images_url, IMAGE_PARK)
+    return image.thumbnail_images.order_by('height').first()
+
+
+@pytest.mark.django_db
+class TestThumbnailVariants:
+
+    def test_webp_variant_is_rendered(self, thumbnail_image):
+        assert 'image/webp' in thumbnail_image.variants
+
+    def test_accepted_variant_is_served(self, client, thumbnail_image):
+        url = reverse('serve_thumbnail_image', kwargs={'image_id': str(thumbnail_image.id)})
+        response = client.get(url, HTTP_ACCEPT='image/avif,image/webp,image/apng,*/*;q=0.8')
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'image/webp'
+        assert 'Accept' in response['Vary']
+
+    def test_original_format_is_served_by_default(self, client, thumbnail_image):
+        url = reverse('serve_thumbnail_image', kwargs={'image_id': str(thumbnail_image.id)})
+        response = client.get(url, HTTP_ACCEPT='image/webp;q=0, */*')
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'image/jpeg'
+        assert 'Accept' in response['Vary']
+
+
+class TestAcceptedMediaTypes:
+
+    @pytest.mark.parametrize('accept_header, media_types', [
+        ('', set()),
+        ('image/avif,image/webp,*/*;q=0.8', {'image/avif', 'image/webp', '*/*'}),
+        ('image/webp;q=0, image/png', {'image/png'}),
+        ('IMAGE/WEBP; q=0.5', {'image/webp'}),
+    ])
+    def test_parse_accept_header(self, accept_header, media_types):
+        assert get_accepted_media_types(accept_header) == media_types
@@ -0,0 +1,49 @@
+import pytest
+from django.core.cache import cache
+from imagesservice import tier_capabilities
+from .config import BASIC_ALLOWED_THUMBNAIL_HEIGHTS, ENTERPRISE_ALLOWED_THUMBNAIL_HEIGHTS
+from ...models import AccountTier, ThumbnailSize
+
+
+@pytest.fixture
+def basic_tier():
+    return AccountTier.objects.get(name="Basic")
+
+
+@pytest.mark.django_db
+class TestTierCapabilities:
+
+    def test_snapshot(self, basic_tier, django_assert_num_queries):
+        capabilities = AccountTier.objects.get_capabilities(basic_tier.id)
+        assert capabilities.allowed_thumbnails_heights == frozenset(BASIC_ALLOWED_THUMBNAIL_HEIGHTS)
+        assert capabilities.can_see_original_img == basic_tier.enable_original_link
+        assert capabilities.can_see_expiring_img == basic_tier.enable_generate_expiring_links
+
+        with django_assert_num_queries(0):
+            assert AccountTier.objects.get_capabilities(basic_tier.id) is capabilities
+            assert basic_tier.allowed_thumbnails_heights == BASIC_ALLOWED_THUMBNAIL_HEIGHTS
+
+    def test_tier_change(self, basic_tier):
+        AccountTier.objects.get_capabilities(basic_tier.id)
+        basic_tier.enable_original_link = not basic_tier.enable_original_link
+        basic_tier.save()
+        assert AccountTier.objects.get_capabilities(basic_tier.id).can_see_original_img == basic_tier.enable_original_link
+
+    def test_thumbnail_sizes_change(self, basic_tier):
+        AccountTier.objects.get_capabilities(basic_tier.id)
+        thumbnail_size = ThumbnailSize.objects.create(height=123)
+        thumbnail_size.tiers.add(basic_tier)
+        assert basic_tier.allowed_thumbnails_heights == sorted(BASIC_ALLOWED_THUMBNAIL_HEIGHTS + [123])
+
+        thumbnail_size.delete()
+        assert basic_tier.allowed_thumbnails_heights == BASIC_ALLOWED_THUMBNAIL_HEIGHTS
+
+        ThumbnailSize.objects.get(height=ENTERPRISE_ALLOWED_THUMBNAIL_HEIGHTS[-1]).tiers.add(basic_tier)
+        assert ENTERPRISE_ALLOWED_THUMBNAIL_HEIGHTS[-1] in basic_tier.allowed_thumbnails_heights
+
+    def test_change_in_other_process(self, basic_tier, django_assert_num_queries):
+        AccountTier.objects.get_capabilities(basic_tier.id)
+        # another process only changes the version in the shared cache
+        cache.set(tier_capabilities.VERSION_KEY, 'other')
+        with django_assert_num_queries(2):
+            AccountTier.objects.get_capabilities(basic_tier.id)
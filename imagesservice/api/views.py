@@ -1,13 +1,17 @@
+import json
+from typing import Optional
+from django.core.exceptions import ValidationError
+from django.db.models import Q
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.permissions import BasePermission
 from rest_framework.exceptions import NotFound
 from rest_framework.filters import BaseFilterBackend
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from . import serializers
-from ..models import ExpiringImage, Image
+from ..models import ExpiringImage, Image, get_user_tier_capabilities
 from .decorators import get_image_id_on_queryset
 
 
@@ -17,13 +21,100 @@ class Pagination(PageNumberPagination):
     max_page_size = 10
 
 
-class ImageViewSet(ModelViewSet):
+class KeysetPagination(CursorPagination):
+    '''
+    Pages start after the values of all the ordering fields of the last item (`?pagination=cursor`),
+    unlike page numbers it doesn't count the rows nor skip the previous pages
+    '''
+    page_size = Pagination.page_size
+    page_size_query_param = Pagination.page_size_query_param
+    max_page_size = Pagination.max_page_size
+
+    def __init__(self, ordering):
+        self.ordering = ordering
+
+    def get_ordering(self, request, queryset, view):
+        return self.ordering
+
+    def _get_position_from_instance(self, instance, ordering):
+        return json.dumps([str(getattr(instance, order.lstrip('-'))) for order in ordering])
+
+    def get_keyset_filter(self, queryset, position: str, reverse: bool) -> Q:
+        '''
+        Rows after the position in the ordering, (a, b) < (x, y) as a < x or a = x and b < y
+        '''
+        try:
+            values = json.loads(position)
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            keyset_filter, equal = Q(), {}
+            for order, value in zip(self.ordering, values):
+                attr = order.lstrip('-')
+                value = queryset.model._meta.get_field(attr).to_python(value)
+                lookup = 'lt' if order.startswith('-') != reverse else 'gt'
+                keyset_filter |= Q(**equal, **{f"{attr}__{lookup}": value})
+                equal[attr] = value
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return keyset_filter
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # `CursorPagination.paginate_queryset` compares the first ordering field only and skips the items sharing its value
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, current_position = False, None
+        else:
+            _, reverse, current_position = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*(order[1:] if order.startswith('-') else f"-{order}" for order in self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if current_position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(queryset, current_position, reverse))
+
+        # one more item tells whether there's a following page
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following_position = self._get_position_from_instance(results[-1], self.ordering) if len(results) > len(self.page) else None
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.next_position = current_position is not None, current_position
+            self.has_previous, self.previous_position = following_position is not None, following_position
+        else:
+            self.has_next, self.next_position = following_position is not None, following_position
+            self.has_previous, self.previous_position = current_position is not None, current_position
+        self.display_page_controls = self.has_previous or self.has_next
+        return self.page
+
+
+class KeysetPaginationMixin:
+    '''
+    Page numbers by default, keyset pagination on `keyset_ordering` with `?pagination=cursor`
+    '''
+    keyset_ordering = ()
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.request.query_params.get('pagination') == 'cursor':
+                self._paginator = KeysetPagination(self.keyset_ordering)
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+
+class ImageViewSet(KeysetPaginationMixin, ModelViewSet):
     serializer_class = serializers.ImageSerializer
     pagination_class = Pagination
+    keyset_ordering = ('-upload_datetime', '-id')
 
     def get_queryset(self):
-        queryset = Image.objects.filter(user=self.request.user).order_by('-upload_datetime')
-        return queryset
+        queryset = Image.objects.filter(user=self.request.user).order_by(*self.keyset_ordering)
+        return queryset.prefetch_related(*serializers.get_image_prefetches(self.request.user))
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -48,29 +139,41 @@ class ExpiringImageFilter(BaseFilterBackend):
 
 class ExpiringImagePermission(BasePermission):
     def has_permission(self, request, view):
-        user = request.user
-        if hasattr(user, 'useraccounttier'):
-            return user.useraccounttier.account_tier.can_see_expiring_img()
-        return False
+        capabilities = get_user_tier_capabilities(request.user)
+        return bool(capabilities and capabilities.can_see_expiring_img)
 
 
-class ExpiringImageViewSet(ModelViewSet):
+class ExpiringImageViewSet(KeysetPaginationMixin, ModelViewSet):
     serializer_class = serializers.ExpiringImageBaseSerializer
     pagination_class = Pagination
+    keyset_ordering = ('-expiration_datetime', '-creation_datetime', '-id')
     list_view_filter_backends = (ExpiringImageFilter, )
     permission_classes = (ExpiringImagePermission, )
 
     @get_image_id_on_queryset
     def get_queryset(self, image_id):
-        try:
-            Image.objects.get(id=image_id)
-            queryset = ExpiringImage.objects.filter(image__id=image_id, image__user=self.request.user).order_by('-expiration_datetime', '-creation_datetime')
-            if self.action == 'list':
-                for filter_backend in self.list_view_filter_backends:
-                    queryset = filter_backend().filter_queryset(self.request, queryset, view=self)
-            return queryset
-        except Image.DoesNotExist:
+        # the owner is checked by the same query
+        queryset = ExpiringImage.objects.filter(image__id=image_id, image__user=self.request.user).order_by(*self.keyset_ordering)
+        if self.action == 'list':
+            for filter_backend in self.list_view_filter_backends:
+                queryset = filter_backend().filter_queryset(self.request, queryset, view=self)
+        return queryset
+
+    @get_image_id_on_queryset
+    def get_image(self, image_id) -> Optional[Image]:
+        '''
+        The image of the url if it belongs to the user, queried once per request
+        '''
+        if not hasattr(self, '_image'):
+            self._image = Image.objects.filter(id=image_id, user=self.request.user).first()
+        return self._image
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        # an empty page doesn't tell a missing image from one without expiring images
+        if not page and self.get_image() is None:
             raise NotFound("Image not found", code=status.HTTP_400_BAD_REQUEST)
+        return page
 
     def options(self, request, *args, **kwargs):
         metadata = self.metadata_class()
@@ -81,7 +184,13 @@ class ExpiringImageViewSet(ModelViewSet):
                     'default': 'active',
                     'options': ['active', 'expired', 'all'],
                     'description': 'An optional parameter for filtering expiring images.',
-                }
+                },
+                'pagination': {
+                    'type': 'string',
+                    'default': 'page',
+                    'options': ['page', 'cursor'],
+                    'description': 'An optional parameter for paginating by cursor, following the `next` and `previous` links.',
+                },
             }
         return Response(data)
 
@@ -96,6 +205,9 @@ class ExpiringImageViewSet(ModelViewSet):
         image_id = self.kwargs.get('image_id')
         if image_id:
             context['image_id'] = image_id
+            if self.action == 'create':
+                # checked by `validate_image_id`
+                context['image'] = self.get_image()
         return context
 
     def create(self, request, *args, **kwargs):
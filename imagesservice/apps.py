@@ -5,3 +5,6 @@ class ImagesserviceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'imagesservice'
     verbose_name = "Images Service"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,124 @@
+import time
+from typing import Optional
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponseNotFound, HttpResponseForbidden
+from django.utils.cache import patch_vary_headers
+from . import serve_cache, signed_links
+from .config import UPGRADE_ACCOUNT_TIER_MESSAGE
+from .models import Image, ExpiringImage, ThumbnailImage, clamp_resize_height, get_accepted_file_path
+from .resize_cache import get_resized_image_path
+from .utils import aget_file_response, get_accepted_media_types
+
+
+# the same views as `views`, for ASGI servers (ASYNC_SERVE_VIEWS=true): slow downloads don't hold a thread each
+
+
+async def load_image_record(image_id) -> Optional[dict]:
+    image = await Image.objects.for_serving().filter(id=image_id).afirst()
+    return image.get_serve_record() if image else None
+
+
+async def load_thumbnail_image_record(image_id) -> Optional[dict]:
+    image = await ThumbnailImage.objects.for_serving().filter(id=image_id).afirst()
+    return image.get_serve_record() if image else None
+
+
+async def load_temp_image_record(image_id) -> Optional[dict]:
+    image = await ExpiringImage.objects.for_serving().filter(id=image_id).afirst()
+    return image.get_serve_record() if image else None
+
+
+async def get_record_or_404(kind: str, image_id, load) -> dict:
+    record = await serve_cache.aget_record(kind, image_id, load)
+    if record is None:
+        raise Http404
+    return record
+
+
+def render_thumbnail_image(image_id) -> dict:
+    image: ThumbnailImage = ThumbnailImage.objects.for_serving().get(id=image_id)
+    image.render()
+    return image.get_serve_record()
+
+
+async def serve_image(request, image_id):
+    '''
+    Serve original image
+    '''
+    record = await get_record_or_404('image', image_id, load_image_record)
+    if not record['can_be_displayed']:
+        return HttpResponseForbidden(UPGRADE_ACCOUNT_TIER_MESSAGE)
+    return await aget_file_response(request, record['path'], settings.IMAGE_CACHE_MAX_AGE)
+
+
+async def serve_resized_image(request, image_id, height):
+    '''
+    Serve original image resized to the given height, clamped to the range of the owner's account tier
+    '''
+    record = await get_record_or_404('image', image_id, load_image_record)
+    resize_height = clamp_resize_height(int(height), record['min_resize_height'], record['max_resize_height'])
+    if resize_height is None:
+        return HttpResponseForbidden(UPGRADE_ACCOUNT_TIER_MESSAGE)
+    try:
+        resized_image_path = await sync_to_async(get_resized_image_path, thread_sensitive=False)(
+            record['path'], record['name'], resize_height
+        )
+    except FileNotFoundError:
+        return HttpResponseNotFound("Image not found")
+    return await aget_file_response(request, resized_image_path, settings.IMAGE_CACHE_MAX_AGE)
+
+
+async def serve_thumbnail_image(request, image_id):
+    '''
+    Serve original image
+    '''
+    record = await get_record_or_404('thumbnail', image_id, load_thumbnail_image_record)
+    if not record['can_be_displayed']:
+        return HttpResponseForbidden(UPGRADE_ACCOUNT_TIER_MESSAGE)
+    if not record['path']:
+        record = await sync_to_async(render_thumbnail_image)(image_id)
+    accepted_media_types = get_accepted_media_types(request.headers.get('Accept', ''))
+    file_path = get_accepted_file_path(record['path'], record['variants'], accepted_media_types)
+    response = await aget_file_response(request, file_path, settings.IMAGE_CACHE_MAX_AGE)
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+async def serve_temp_image(request, image_id):
+    '''
+    Serve temporary, expiration image
+    '''
+    record = await get_record_or_404('temp', image_id, load_temp_image_record)
+
+    if not record['can_be_displayed']:
+        return HttpResponseForbidden(UPGRADE_ACCOUNT_TIER_MESSAGE)
+
+    remaining_lifetime = int(record['expiration_timestamp'] - time.time())
+    if remaining_lifetime < 0:
+        return HttpResponseNotFound("Image expired")
+
+    # cached at most until the link expires
+    return await aget_file_response(request, record['path'], min(remaining_lifetime, settings.IMAGE_CACHE_MAX_AGE))
+
+
+async def serve_signed_temp_image(request, token):
+    '''
+    Serve temporary, expiration image of a signed link, expired links are rejected without any lookup
+    '''
+    link = signed_links.verify(token)
+    if link is None:
+        raise Http404
+
+    remaining_lifetime = link.expires - int(time.time())
+    if remaining_lifetime < 0:
+        return HttpResponseNotFound("Image expired")
+    if await sync_to_async(signed_links.is_revoked)(link):
+        return HttpResponseNotFound("Image expired")
+
+    record = await get_record_or_404('image', link.image_id, load_image_record)
+    if not record['can_see_expiring_img']:
+        return HttpResponseForbidden(UPGRADE_ACCOUNT_TIER_MESSAGE)
+
+    # cached at most until the link expires
+    return await aget_file_response(request, record['path'], min(remaining_lifetime, settings.IMAGE_CACHE_MAX_AGE))
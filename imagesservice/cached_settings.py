@@ -0,0 +1,36 @@
+from typing import Any, Callable
+from django.core.cache import cache
+from .config import CACHED_SETTINGS_TIMEOUT
+
+
+MAX_THUMBNAIL_HEIGHT = 'max_thumbnail_height'
+
+# cached for settings without a value, `None` is returned by the cache for missing keys
+NONE = 'none'
+
+
+def get_key(name: str) -> str:
+    return f"settings:{name}"
+
+
+def get(name: str, load: Callable[[], Any]) -> Any:
+    '''
+    Value of the setting from the default cache, `load` reads it from the database on a cache miss
+    '''
+    value = cache.get(get_key(name))
+    if value is None:
+        return refresh(name, load)
+    return None if value == NONE else value
+
+
+def refresh(name: str, load: Callable[[], Any]) -> Any:
+    '''
+    Write the current value through to the cache, called when the rows it's read from change
+    '''
+    value = load()
+    cache.set(get_key(name), NONE if value is None else value, CACHED_SETTINGS_TIMEOUT)
+    return value
+
+
+def invalidate(name: str):
+    cache.delete(get_key(name))
@@ -3,3 +3,32 @@
 UPGRADE_ACCOUNT_TIER_MESSAGE = "Owner need to upgrade account tier"
 EXPIRE_AFTER_MIN = 300
 EXPIRE_AFTER_MAX = 30000
+
+FILE_DELIVERY_DJANGO = "django"
+FILE_DELIVERY_X_ACCEL = "x-accel"
+SERVE_CACHE_TIMEOUT = 3600  # seconds the data needed to serve an image is cached
+SERVE_CACHE_NEGATIVE_TIMEOUT = 60  # seconds unknown ids are remembered
+REVOKED_LINKS_PURGE_PROBABILITY = 0.01  # share of signed link revocations that also delete the expired ones
+CACHED_SETTINGS_TIMEOUT = 3600  # seconds values of `cached_settings` are kept, they are rewritten when their rows change
+RANGE_CHUNK_SIZE = 64 * 1024  # bytes read at a time when sending ranges of a file
+MAX_BYTE_RANGES = 20  # requests with more ranges get the whole file
+
+THUMBNAIL_GENERATION_EAGER = "eager"
+THUMBNAIL_GENERATION_QUEUED = "queued"
+THUMBNAIL_GENERATION_LAZY = "lazy"
+THUMBNAIL_DIR = "images/thumb/"
+RESIZE_CACHE_DIR = "cache/resized/"
+
+# longer side in px and JPEG quality of the placeholder inlined in API responses
+IMAGE_PLACEHOLDER_SIZE = 16
+IMAGE_PLACEHOLDER_QUALITY = 40
+
+THUMBNAIL_JOB_MAX_ATTEMPTS = 5
+THUMBNAIL_JOB_VISIBILITY_TIMEOUT = 300  # seconds a claimed job stays invisible to other workers
+THUMBNAIL_JOB_RETRY_DELAY = 30  # seconds, multiplied by the number of attempts
+
+# variant name (file extension) -> (Pillow format, media type)
+THUMBNAIL_VARIANT_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "avif": ("AVIF", "image/avif"),
+}
@@ -0,0 +1,52 @@
+import os
+from django.core.management.base import BaseCommand
+from PIL import Image as PIL_Image
+from ...models import Image, ThumbnailImage
+from ...utils import probe_image
+
+
+class Command(BaseCommand):
+    help = "Store dimensions, format and size of originals and thumbnails uploaded before they were recorded"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Number of rows read and updated at a time")
+
+    def handle(self, *args, **options):
+        images = self.backfill(
+            Image.objects.filter(size_bytes__isnull=True).exclude(filename=''),
+            ['width', 'height', 'format', 'size_bytes'], options['batch_size'],
+        )
+        thumbnail_images = self.backfill(
+            ThumbnailImage.objects.rendered().filter(size_bytes__isnull=True),
+            ['width', 'format', 'size_bytes'], options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Done, {images} images and {thumbnail_images} thumbnails updated"))
+
+    def backfill(self, queryset, fields, batch_size) -> int:
+        updated = 0
+        last_pk = None
+        queryset = queryset.only('pk', 'filename').order_by('pk')
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size] if last_pk is not None else queryset[:batch_size])
+            if not batch:
+                return updated
+            last_pk = batch[-1].pk
+
+            changed = []
+            for obj in batch:
+                try:
+                    with open(obj.filename.path, 'rb') as fp:
+                        image_probe = probe_image(fp)
+                    obj.size_bytes = os.path.getsize(obj.filename.path)
+                except (OSError, PIL_Image.UnidentifiedImageError) as error:
+                    self.stderr.write(f"Reading {obj._meta.model_name} {obj.pk} failed: {error!r}")
+                    continue
+                obj.width, obj.format = image_probe.width, image_probe.format
+                if 'height' in fields:
+                    obj.height = image_probe.height
+                changed.append(obj)
+
+            # a single UPDATE per batch
+            queryset.model.objects.bulk_update(changed, fields)
+            updated += len(changed)
+            self.stdout.write(f"{updated} {queryset.model._meta.verbose_name_plural} updated")
@@ -0,0 +1,128 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from ...config import THUMBNAIL_GENERATION_LAZY
+from ...models import Image, ThumbnailImage, get_thumbnail_images_paths
+from ...rendering import render_thumbnails
+
+
+DEFAULT_CHECKPOINT = os.path.join(settings.BASE_DIR, '.backfill_thumbnails.json')
+
+
+class Command(BaseCommand):
+    help = "Render thumbnails missing after thumbnail sizes of account tiers or users tiers have changed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help="Number of images loaded at a time")
+        parser.add_argument('--workers', type=int, default=4, help="Number of images rendered at the same time")
+        parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help="File storing the progress, used to resume the backfill")
+        parser.add_argument('--restart', action='store_true', help="Ignore the stored progress and start from the first image")
+
+    def handle(self, *args, **options):
+        checkpoint_path = options['checkpoint']
+        progress = {'last_image_id': None, 'images': 0, 'thumbnails': 0, 'failed': 0, 'failed_image_ids': []}
+        if not options['restart'] and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as checkpoint:
+                progress.update(json.load(checkpoint))
+            self.stdout.write(f"Resuming after image {progress['last_image_id']}")
+
+        tiers_heights = {}
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            while batch := self.get_batch(progress['last_image_id'], options['batch_size']):
+                progress['failed_image_ids'] += self.backfill(batch, tiers_heights, executor, progress)
+                progress['images'] += len(batch)
+                progress['last_image_id'] = str(batch[-1].pk)
+                self.save_checkpoint(checkpoint_path, progress)
+                self.stdout.write(f"{progress['images']} images checked, {progress['thumbnails']} thumbnails backfilled, {progress['failed']} failed")
+
+            # failed in this or a previous run, the checkpoint already moved past them
+            if progress['failed_image_ids']:
+                self.stdout.write(f"Retrying {len(progress['failed_image_ids'])} failed images")
+                retry_batch = list(self.get_queryset().filter(pk__in=progress['failed_image_ids']))
+                progress['failed'] -= len(progress['failed_image_ids'])
+                progress['failed_image_ids'] = self.backfill(retry_batch, tiers_heights, executor, progress)
+                self.save_checkpoint(checkpoint_path, progress)
+
+        if progress['failed_image_ids']:
+            raise CommandError(f"Rendering thumbnails of {len(progress['failed_image_ids'])} images failed, "
+                               f"run the command again to retry them: {', '.join(progress['failed_image_ids'])}")
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        self.stdout.write(self.style.SUCCESS(f"Done, {progress['thumbnails']} thumbnails backfilled"))
+
+    def backfill(self, batch, tiers_heights, executor, progress) -> list:
+        '''
+        Create the missing thumbnails of the images, returns ids of the images whose rendering failed
+        '''
+        missing_heights = self.get_missing_heights(batch, tiers_heights)
+        images = [image for image in batch if missing_heights[image.pk]]
+
+        if settings.THUMBNAIL_GENERATION_MODE == THUMBNAIL_GENERATION_LAZY:
+            for image in images:
+                image.create_thumbnail_placeholders(missing_heights[image.pk])
+                progress['thumbnails'] += len(missing_heights[image.pk])
+            return []
+
+        failed_image_ids = []
+        # loaded here, the rendering threads don't touch the database
+        encoder_profiles = {image.pk: image.get_encoder_profiles(missing_heights[image.pk]) for image in images}
+        rendered = executor.map(lambda image: self.render(image, missing_heights[image.pk], encoder_profiles), images)
+        for image, render_result in zip(images, rendered):
+            if render_result is None:
+                failed_image_ids.append(str(image.pk))
+                continue
+            thumbnail_images_paths, rendered_thumbnails = render_result
+            image.save_thumbnails(thumbnail_images_paths, rendered_thumbnails)
+            progress['thumbnails'] += len(thumbnail_images_paths)
+        progress['failed'] += len(failed_image_ids)
+        return failed_image_ids
+
+    def get_queryset(self):
+        return Image.objects.select_related('user__useraccounttier__account_tier').exclude(filename='').order_by('pk')
+
+    def get_batch(self, last_image_id, batch_size):
+        queryset = self.get_queryset()
+        if last_image_id is not None:
+            queryset = queryset.filter(pk__gt=last_image_id)
+        return list(queryset[:batch_size])
+
+    def get_missing_heights(self, batch, tiers_heights):
+        '''
+        Map image ids to the allowed heights without a rendered thumbnail
+        '''
+        rendered_heights = {image.pk: set() for image in batch}
+        for image_id, height in ThumbnailImage.objects.rendered().filter(image__in=batch).values_list('image_id', 'height'):
+            rendered_heights[image_id].add(height)
+
+        missing_heights = {}
+        for image in batch:
+            account_tier = getattr(image.user, 'useraccounttier', None)
+            if account_tier is None:
+                missing_heights[image.pk] = []
+                continue
+            if account_tier.account_tier_id not in tiers_heights:
+                tiers_heights[account_tier.account_tier_id] = account_tier.account_tier.allowed_thumbnails_heights
+            allowed_heights = tiers_heights[account_tier.account_tier_id]
+            missing_heights[image.pk] = [height for height in allowed_heights if height not in rendered_heights[image.pk]]
+        return missing_heights
+
+    def render(self, image, heights, encoder_profiles):
+        try:
+            thumbnail_images_paths = get_thumbnail_images_paths(image.filename.path, heights)
+            rendered_thumbnails = render_thumbnails(image.filename.path, {
+                height: os.path.join(settings.MEDIA_ROOT, thumbnail_image_path)
+                for height, thumbnail_image_path in thumbnail_images_paths.items()
+            }, encoder_profiles[image.pk])
+        except Exception as error:
+            self.stderr.write(f"Rendering thumbnails of image {image.pk} failed: {error!r}")
+            return None
+        return thumbnail_images_paths, rendered_thumbnails
+
+    def save_checkpoint(self, checkpoint_path, progress):
+        # written next to the checkpoint and renamed, a crash never leaves a partially written file
+        temporary_path = f"{checkpoint_path}.tmp"
+        with open(temporary_path, 'w') as checkpoint:
+            json.dump(progress, checkpoint)
+        os.replace(temporary_path, checkpoint_path)
@@ -0,0 +1,115 @@
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from copy import copy
+from PIL import Image as PIL_Image
+from django.core.management.base import BaseCommand
+from ...rendering import get_thumbnail_size, render_thumbnails_cascade
+
+
+# (width, height) of the generated 4:3 originals
+ORIGINAL_SIZES = {
+    12: (4000, 3000),
+    24: (5664, 4248),
+    48: (8000, 6000),
+}
+
+
+def render_thumbnails_copies(source_path, destination_paths):
+    '''
+    The previous approach: a full resolution copy of the decoded original for every height
+    '''
+    original_image = PIL_Image.open(source_path)
+    for height, destination_path in destination_paths.items():
+        image_to_thumbnail = copy(original_image)
+        image_to_thumbnail.thumbnail(get_thumbnail_size(original_image.size, height))
+        image_to_thumbnail.save(destination_path)
+
+
+APPROACHES = {
+    'copies': render_thumbnails_copies,
+    'cascade': render_thumbnails_cascade,
+}
+
+
+def create_original(path, size):
+    # upscaled noise, so the encoder can't compress the image to almost nothing
+    width, height = size
+    noise = PIL_Image.effect_noise((width // 8, height // 8), 64).resize(size, PIL_Image.Resampling.BICUBIC)
+    gradient = PIL_Image.linear_gradient('L').resize(size)
+    PIL_Image.merge('RGB', (noise, gradient, noise.transpose(PIL_Image.Transpose.FLIP_LEFT_RIGHT))).save(path, quality=90)
+
+
+def get_peak_rss() -> int:
+    '''
+    Peak RSS of the current process in KiB
+    '''
+    try:
+        # unlike `ru_maxrss`, the high water mark isn't inherited from the parent over fork + exec
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(approach, source_path, destination_paths, results):
+    '''
+    Runs in a fresh process, so the peak RSS belongs to a single approach
+    '''
+    baseline_rss = get_peak_rss()
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    APPROACHES[approach](source_path, destination_paths)
+    peak_rss = get_peak_rss()
+    results.put({
+        'cpu': time.process_time() - cpu_start,
+        'wall': time.perf_counter() - wall_start,
+        'peak_rss': peak_rss,
+        'rss_growth': peak_rss - baseline_rss,
+    })
+
+
+class Command(BaseCommand):
+    help = "Compare CPU time and peak RSS of thumbnail rendering approaches on large originals"
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--megapixels', type=int, nargs='+', choices=sorted(ORIGINAL_SIZES), default=sorted(ORIGINAL_SIZES))
+        parser.add_argument('--heights', type=int, nargs='+', default=[200, 400])
+        parser.add_argument('--repeat', type=int, default=3, help="Runs of every approach, the best one is reported")
+        parser.add_argument('--source', help="Benchmark this image instead of generated originals")
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('spawn')
+
+        with tempfile.TemporaryDirectory() as workdir:
+            sources = {}
+            if options['source']:
+                sources[os.path.basename(options['source'])] = options['source']
+            else:
+                for megapixels in options['megapixels']:
+                    source_path = os.path.join(workdir, f"{megapixels}mp.jpg")
+                    create_original(source_path, ORIGINAL_SIZES[megapixels])
+                    sources[f"{megapixels} MP"] = source_path
+
+            self.stdout.write(f"{'original':>12} {'approach':>8} {'cpu [s]':>8} {'wall [s]':>9} {'peak RSS [MB]':>14} {'RSS growth [MB]':>16}")
+            for label, source_path in sources.items():
+                extension = os.path.splitext(source_path)[1]
+                destination_paths = {height: os.path.join(workdir, f"{height}{extension}") for height in options['heights']}
+                for approach in APPROACHES:
+                    runs = []
+                    for _ in range(options['repeat']):
+                        results = context.Queue()
+                        process = context.Process(target=measure, args=(approach, source_path, destination_paths, results))
+                        process.start()
+                        runs.append(results.get())
+                        process.join()
+                    best = min(runs, key=lambda run: run['cpu'])
+                    self.stdout.write(
+                        f"{label:>12} {approach:>8} {best['cpu']:>8.3f} {best['wall']:>9.3f} "
+                        f"{best['peak_rss'] / 1024:>14.1f} {best['rss_growth'] / 1024:>16.1f}"
+                    )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from ...resize_cache import evict, get_stats
+
+
+class Command(BaseCommand):
+    help = "Show usage and hit/miss counters of the cache of images resized on request"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help="Delete all cached images")
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            self.stdout.write(f"{evict(0)} cached images deleted")
+
+        stats = get_stats()
+        requests = stats['hits'] + stats['misses']
+        hit_ratio = stats['hits'] / requests if requests else 0
+        self.stdout.write(
+            f"{stats['files']} images, {stats['bytes'] / 1024 ** 2:.1f} of {stats['max_bytes'] / 1024 ** 2:.1f} MB, "
+            f"{stats['hits']} hits, {stats['misses']} misses ({hit_ratio:.0%} hit ratio)"
+        )
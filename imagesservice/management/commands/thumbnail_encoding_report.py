@@ -0,0 +1,56 @@
+import os
+from collections import defaultdict
+from io import BytesIO
+from PIL import Image as PIL_Image
+from django.core.management.base import BaseCommand
+from ...models import ThumbnailImage
+from ...rendering import REDUCING_GAP, get_save_options, get_thumbnail_size
+
+
+class Command(BaseCommand):
+    help = "Compare bytes on disk of rendered thumbnails with their size when encoded with the current encoder profiles"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=200, help="Number of the most recent thumbnails to re-encode")
+        parser.add_argument('--tier', help="Only thumbnails of images of users with this account tier")
+
+    def handle(self, *args, **options):
+        thumbnail_images = ThumbnailImage.objects.rendered().select_related(
+            'image__user__useraccounttier__account_tier__encoder_profile'
+        ).order_by('-update_datetime')
+        if options['tier']:
+            thumbnail_images = thumbnail_images.filter(image__user__useraccounttier__account_tier__name=options['tier'])
+
+        # tier name -> [thumbnails, bytes on disk, bytes with the encoder profile]
+        report = defaultdict(lambda: [0, 0, 0])
+        skipped = 0
+        for thumbnail_image in thumbnail_images[:options['limit']]:
+            try:
+                bytes_before = os.path.getsize(thumbnail_image.filename.path)
+                bytes_after = self.encode(thumbnail_image)
+            except (OSError, PIL_Image.UnidentifiedImageError):
+                skipped += 1
+                continue
+            tier_report = report[thumbnail_image.image.user.useraccounttier.account_tier.name]
+            tier_report[0] += 1
+            tier_report[1] += bytes_before
+            tier_report[2] += bytes_after
+
+        self.stdout.write(f"{'tier':>20} {'thumbnails':>10} {'before [B]':>12} {'after [B]':>12} {'change':>8}")
+        for tier_name, (count, bytes_before, bytes_after) in sorted(report.items()):
+            change = (bytes_after - bytes_before) / bytes_before * 100 if bytes_before else 0
+            self.stdout.write(f"{tier_name:>20} {count:>10} {bytes_before:>12} {bytes_after:>12} {change:>7.1f}%")
+        if skipped:
+            self.stdout.write(f"{skipped} thumbnails skipped, their files are missing or unreadable")
+
+    def encode(self, thumbnail_image):
+        '''
+        Bytes of the thumbnail rendered from the original with the encoder profile of its size or tier
+        '''
+        encoder_profile = thumbnail_image.image.get_encoder_profiles([thumbnail_image.height]).get(thumbnail_image.height)
+        with PIL_Image.open(thumbnail_image.image.filename.path) as image_to_thumbnail:
+            image_format = image_to_thumbnail.format
+            image_to_thumbnail.thumbnail(get_thumbnail_size(image_to_thumbnail.size, thumbnail_image.height), reducing_gap=REDUCING_GAP)
+            encoded = BytesIO()
+            image_to_thumbnail.save(encoded, format=image_format, **get_save_options(image_to_thumbnail, image_format, encoder_profile))
+        return encoded.tell()
@@ -0,0 +1,47 @@
+import os
+import signal
+import socket
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from ...models import ThumbnailJob
+
+
+class Command(BaseCommand):
+    help = "Render pending thumbnails queued by image uploads"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Process the currently available jobs and exit")
+        parser.add_argument('--batch-size', type=int, default=1, help="Number of jobs claimed at a time")
+        parser.add_argument('--sleep', type=float, default=2.0, help="Seconds to wait when the queue is empty")
+        parser.add_argument('--name', default=f"{socket.gethostname()}:{os.getpid()}", help="Worker name stored on claimed jobs")
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        previous_handlers = {signum: signal.signal(signum, self.stop) for signum in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            self.work(options)
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+
+    def work(self, options):
+        while not self.stopping:
+            jobs = ThumbnailJob.objects.claim(options['name'], limit=options['batch_size'])
+            if not jobs:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                close_old_connections()
+                continue
+
+            for job in jobs:
+                try:
+                    job.run()
+                except Exception as error:
+                    self.stderr.write(f"Thumbnail job {job.pk} for image {job.image_id} failed: {error!r}")
+                else:
+                    self.stdout.write(f"Thumbnail job {job.pk} for image {job.image_id} done")
+
+    def stop(self, signum, frame):
+        self.stopping = True
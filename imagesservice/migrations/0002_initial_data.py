@@ -1,12 +1,19 @@
 from django.db import migrations
 from django.core.management import call_command
+from django.core.serializers import python as python_serializer
 
 
 APP_NAME = 'imagesservice'
 
 
 def insert_data(apps, schema_editor):
-    call_command('loaddata', 'initial_data/initial_data.json', verbosity=2)
+    # deserialize the fixture against the historical models, so columns added by later migrations don't break it
+    current_apps = python_serializer.apps
+    python_serializer.apps = apps
+    try:
+        call_command('loaddata', 'initial_data/initial_data.json', verbosity=2)
+    finally:
+        python_serializer.apps = current_apps
 
 
 def reverse_func(apps, schema_editor):
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:04
+
+from django.db import migrations, models
+import imagesservice.utils
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imagesservice', '0004_thumbnail_jobs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='thumbnailimage',
+            name='filename',
+            field=models.ImageField(blank=True, upload_to=imagesservice.utils.GenerateRandomFileName('images/thumb/')),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:06
+
+import django.core.validators
+from django.db import migrations, models
+import imagesservice.utils
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imagesservice', '0005_lazy_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='image',
+            name='filename',
+            field=models.ImageField(db_index=True, upload_to=imagesservice.utils.GenerateRandomFileName('images/originals/'), validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['png', 'jpg', 'jpeg']), imagesservice.utils.validate_image_min_height]),
+        ),
+        migrations.AlterField(
+            model_name='thumbnailimage',
+            name='filename',
+            field=models.ImageField(blank=True, db_index=True, upload_to=imagesservice.utils.GenerateRandomFileName('images/thumb/')),
+        ),
+    ]
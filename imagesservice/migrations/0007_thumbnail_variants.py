@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imagesservice', '0006_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thumbnailimage',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:10
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imagesservice', '0007_thumbnail_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EncoderProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30, unique=True, verbose_name='Name')),
+                ('quality', models.PositiveSmallIntegerField(default=75, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(95)])),
+                ('progressive', models.BooleanField(default=False, help_text='Progressive JPEG')),
+                ('optimize', models.BooleanField(default=False, help_text='Extra encoder pass for optimal JPEG/PNG settings')),
+                ('subsampling', models.CharField(blank=True, choices=[('', 'Encoder default'), ('4:4:4', '4:4:4'), ('4:2:2', '4:2:2'), ('4:2:0', '4:2:0')], default='', help_text='JPEG chroma subsampling', max_length=5)),
+                ('strip_metadata', models.BooleanField(default=True, help_text='Drop EXIF data, the ICC profile is always kept')),
+                ('png_compress_level', models.PositiveSmallIntegerField(default=6, validators=[django.core.validators.MaxValueValidator(9)])),
+            ],
+        ),
+        migrations.AddField(
+            model_name='accounttier',
+            name='encoder_profile',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='imagesservice.encoderprofile'),
+        ),
+        migrations.AddField(
+            model_name='thumbnailsize',
+            name='encoder_profile',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='imagesservice.encoderprofile'),
+        ),
+    ]
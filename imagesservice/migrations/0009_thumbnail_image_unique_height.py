@@ -0,0 +1,32 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+def delete_duplicate_thumbnail_images(apps, schema_editor):
+    '''
+    Keep the most recently updated thumbnail of every height
+    '''
+    ThumbnailImage = apps.get_model('imagesservice', 'ThumbnailImage')
+    seen = set()
+    duplicate_ids = []
+    for thumbnail_image_id, image_id, height in ThumbnailImage.objects.order_by('image_id', 'height', '-update_datetime').values_list('id', 'image_id', 'height'):
+        if (image_id, height) in seen:
+            duplicate_ids.append(thumbnail_image_id)
+        seen.add((image_id, height))
+    ThumbnailImage.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imagesservice', '0008_encoder_profiles'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_thumbnail_images, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='thumbnailimage',
+            constraint=models.UniqueConstraint(fields=('image', 'height'), name='unique_thumbnail_image_height'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:13
+
+import django.core.validators
+from django.db import migrations, models
+import imagesservice.utils
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imagesservice', '0009_thumbnail_image_unique_height'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='image',
+            name='filename',
+            field=models.ImageField(db_index=True, upload_to=imagesservice.utils.GenerateRandomFileName('images/originals/'), validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['png', 'jpg', 'jpeg']), imagesservice.utils.validate_image_max_pixels, imagesservice.utils.validate_image_min_height]),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imagesservice', '0010_image_max_pixels'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accounttier',
+            name='max_resize_height',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='max resize height in px'),
+        ),
+        migrations.AddField(
+            model_name='accounttier',
+            name='min_resize_height',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='min resize height in px'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imagesservice', '0011_resize_heights'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='format',
+            field=models.CharField(blank=True, editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='height in px'),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='size_bytes',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True, verbose_name='size in bytes'),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='width in px'),
+        ),
+        migrations.AddField(
+            model_name='thumbnailimage',
+            name='format',
+            field=models.CharField(blank=True, editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='thumbnailimage',
+            name='size_bytes',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True, verbose_name='size in bytes'),
+        ),
+        migrations.AddField(
+            model_name='thumbnailimage',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='width in px'),
+        ),
+    ]
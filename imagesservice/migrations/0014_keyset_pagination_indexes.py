@@ -0,0 +1,21 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imagesservice', '0013_image_placeholder'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expiringimage',
+            index=models.Index(fields=['image', '-expiration_datetime', '-creation_datetime', '-id'], name='expiring_image_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='image',
+            index=models.Index(fields=['user', '-upload_datetime', '-id'], name='image_user_upload_keyset'),
+        ),
+    ]
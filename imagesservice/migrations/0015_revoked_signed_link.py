@@ -0,0 +1,21 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imagesservice', '0014_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedSignedLink',
+            fields=[
+                ('expiring_image_id', models.UUIDField(primary_key=True, serialize=False)),
+                ('valid_expires', models.BigIntegerField(default=0)),
+                ('keep_until', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
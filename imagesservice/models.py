@@ -1,18 +1,77 @@
 import os
 import uuid
 from datetime import timedelta
-from copy import copy
-from typing import List
+from typing import Dict, List, Optional
 from PIL import Image as PIL_Image
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.utils.html import mark_safe
 from django.contrib.auth.models import User as DefaultUser
 from django.conf import settings
-from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db.models.fields.files import FieldFile
+from django_cleanup import cleanup
 from django.core.validators import FileExtensionValidator, MinValueValidator, MaxValueValidator
-from .utils import GenerateRandomFileName, validate_image_min_height
-from .config import EXPIRE_AFTER_MIN, EXPIRE_AFTER_MAX
+from .utils import GenerateRandomFileName, probe_image, validate_image_max_pixels, validate_image_min_height, get_content_hash
+from . import cached_settings, serve_cache, signed_links, tier_capabilities
+from .tier_capabilities import TierCapabilities
+from .rendering import RenderedThumbnail, render_placeholder, render_thumbnails, coalesce_renders, get_variant_path
+from .config import (EXPIRE_AFTER_MIN, EXPIRE_AFTER_MAX, THUMBNAIL_GENERATION_QUEUED, THUMBNAIL_GENERATION_LAZY, THUMBNAIL_DIR,
+                     THUMBNAIL_JOB_MAX_ATTEMPTS, THUMBNAIL_JOB_VISIBILITY_TIMEOUT, THUMBNAIL_JOB_RETRY_DELAY, THUMBNAIL_VARIANT_FORMATS)
+
+
+class EncoderProfile(models.Model):
+
+    class Subsampling(models.TextChoices):
+        DEFAULT = "", "Encoder default"
+        YUV444 = "4:4:4", "4:4:4"
+        YUV422 = "4:2:2", "4:2:2"
+        YUV420 = "4:2:0", "4:2:0"
+
+    name = models.CharField(verbose_name="Name", max_length=30, unique=True)
+    # JPEG, WebP and AVIF quality
+    quality = models.PositiveSmallIntegerField(default=75, validators=[MinValueValidator(1), MaxValueValidator(95)])
+    progressive = models.BooleanField(default=False, help_text="Progressive JPEG")
+    optimize = models.BooleanField(default=False, help_text="Extra encoder pass for optimal JPEG/PNG settings")
+    subsampling = models.CharField(max_length=5, choices=Subsampling.choices, default=Subsampling.DEFAULT, blank=True,
+                                   help_text="JPEG chroma subsampling")
+    strip_metadata = models.BooleanField(default=True, help_text="Drop EXIF data, the ICC profile is always kept")
+    png_compress_level = models.PositiveSmallIntegerField(default=6, validators=[MaxValueValidator(9)])
+
+    def __str__(self):
+        return self.name
+
+    def as_options(self) -> dict:
+        return {
+            'quality': self.quality,
+            'progressive': self.progressive,
+            'optimize': self.optimize,
+            'subsampling': self.subsampling,
+            'strip_metadata': self.strip_metadata,
+            'png_compress_level': self.png_compress_level,
+        }
+
+
+def clamp_resize_height(height: int, min_resize_height: Optional[int], max_resize_height: Optional[int]) -> Optional[int]:
+    if max_resize_height is None:
+        return None
+    return min(max(height, min_resize_height or 1), max_resize_height)
+
+
+class AccountTierManager(models.Manager):
+    def get_capabilities(self, account_tier_id: int) -> TierCapabilities:
+        '''
+        What users of the tier are allowed to see, without querying the database while the tiers don't change
+        '''
+        return tier_capabilities.get(account_tier_id, self.load_capabilities)
+
+    def load_capabilities(self, account_tier_id: int) -> TierCapabilities:
+        account_tier = self.get(id=account_tier_id)
+        return TierCapabilities(
+            can_see_original_img=account_tier.enable_original_link,
+            can_see_expiring_img=account_tier.enable_generate_expiring_links,
+            allowed_thumbnails_heights=frozenset(account_tier.thumbnailsize_set.values_list("height", flat=True)),
+        )
 
 
 class AccountTier(models.Model):
@@ -26,6 +85,14 @@ class AccountTier(models.Model):
 
     is_builtin = models.BooleanField(default=False)
 
+    # used for thumbnails of sizes without their own profile, Pillow defaults without any
+    encoder_profile = models.ForeignKey(EncoderProfile, on_delete=models.SET_NULL, null=True, blank=True)
+
+    # range of heights images can be resized to on request, disabled without the maximum
+    min_resize_height = models.PositiveIntegerField(verbose_name="min resize height in px", null=True, blank=True)
+    max_resize_height = models.PositiveIntegerField(verbose_name="max resize height in px", null=True, blank=True)
+    objects = AccountTierManager()
+
     def __str__(self):
         return self.name
 
@@ -35,26 +102,50 @@ class AccountTier(models.Model):
     def can_see_expiring_img(self):
         return self.enable_generate_expiring_links
 
+    def clamp_resize_height(self, height: int) -> Optional[int]:
+        '''
+        The requested height clamped to the range of the tier, `None` when resizing on request isn't allowed
+        '''
+        return clamp_resize_height(height, self.min_resize_height, self.max_resize_height)
+
+    @property
+    def capabilities(self) -> TierCapabilities:
+        return AccountTier.objects.get_capabilities(self.id)
+
     @property
     def allowed_thumbnails_heights(self) -> List[int]:
-        return list(self.thumbnailsize_set.values_list("height", flat=True))
+        return sorted(self.capabilities.allowed_thumbnails_heights)
+
+    def get_encoder_profiles(self, heights: List[int]) -> Dict[int, dict]:
+        '''
+        Encoder options by height, the profile of a thumbnail size takes precedence over the profile of the tier
+        '''
+        tier_encoder_profile = self.encoder_profile.as_options() if self.encoder_profile_id else None
+        encoder_profiles = {height: tier_encoder_profile for height in heights}
+        for thumbnail_size in ThumbnailSize.objects.filter(height__in=heights, encoder_profile__isnull=False).select_related('encoder_profile'):
+            encoder_profiles[thumbnail_size.height] = thumbnail_size.encoder_profile.as_options()
+        return {height: encoder_profile for height, encoder_profile in encoder_profiles.items() if encoder_profile}
 
 
 class ThumbnailSizeManager(models.Manager):
-    def get_max_height(self):
-        max_height = cache.get('max_thumbnail_height')
+    def get_max_height(self) -> Optional[int]:
+        return cached_settings.get(cached_settings.MAX_THUMBNAIL_HEIGHT, self.load_max_height)
 
-        if max_height is None:
-            max_height = self.aggregate(models.Max('height'))['height__max']
-            cache.set('max_thumbnail_height', max_height, 3600)
+    def load_max_height(self) -> Optional[int]:
+        return self.aggregate(models.Max('height'))['height__max']
 
-        return max_height
+    def refresh_max_height(self):
+        cached_settings.refresh(cached_settings.MAX_THUMBNAIL_HEIGHT, self.load_max_height)
+
+    def invalidate_max_height(self):
+        cached_settings.invalidate(cached_settings.MAX_THUMBNAIL_HEIGHT)
 
 
 class ThumbnailSize(models.Model):
     tiers = models.ManyToManyField(AccountTier, blank=True)
     height = models.IntegerField(verbose_name="height in px", unique=True)
     is_builtin = models.BooleanField(default=False)
+    encoder_profile = models.ForeignKey(EncoderProfile, on_delete=models.SET_NULL, null=True, blank=True)
     objects = ThumbnailSizeManager()
 
     def __str__(self):
@@ -65,16 +156,104 @@ class UserAccountTier(models.Model):
     account_tier = models.ForeignKey(AccountTier, on_delete=models.CASCADE)
     user = models.OneToOneField(DefaultUser, on_delete=models.CASCADE)
 
+    @property
+    def capabilities(self) -> TierCapabilities:
+        # by id, the account tier itself isn't loaded
+        return AccountTier.objects.get_capabilities(self.account_tier_id)
+
+
+def get_user_tier_capabilities(user) -> Optional[TierCapabilities]:
+    '''
+    Capabilities of the account tier of the user, `None` for users without any
+    '''
+    if hasattr(user, 'useraccounttier'):
+        return user.useraccounttier.capabilities
+    return None
+
+
+def get_thumbnail_images_paths(original_path: str, heights: List[int]) -> Dict[int, str]:
+    '''
+    New random paths (relative to MEDIA_ROOT) for thumbnails of given heights
+    '''
+    # Create the directory if it doesn't exist
+    os.makedirs(os.path.join(settings.MEDIA_ROOT, THUMBNAIL_DIR), exist_ok=True)
+    return {height: GenerateRandomFileName(THUMBNAIL_DIR)(filename=original_path) for height in heights}
+
+
+def get_stored_filename(instance) -> str:
+    '''
+    Name of the file stored for the instance, empty for a pending upload
+    '''
+    # read the raw value, accessing a deferred field would query the database
+    filename = instance.__dict__.get('filename')
+    if isinstance(filename, str):
+        return filename
+    if isinstance(filename, FieldFile) and filename._committed:
+        return filename.name or ''
+    return ''
+
+
+class StoredFilenameMixin:
+    '''
+    Remembers the name of the file loaded from the database, to tell when it's replaced without querying it again
+    '''
+    _stored_filename = ''
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_filename = get_stored_filename(instance)
+        return instance
+
+    def filename_has_changed(self) -> bool:
+        return self._state.adding or get_stored_filename(self) != self._stored_filename
+
+
+class ImageManager(models.Manager):
+    def for_serving(self):
+        '''
+        Images with the account tier of their owner, authorized without further queries
+        '''
+        return self.select_related('user__useraccounttier__account_tier')
+
+
+# files can be shared by images with the same content, they are deleted by `release_files`, not django_cleanup
+@cleanup.ignore
+class Image(StoredFilenameMixin, models.Model):
+
+    class ThumbnailsStatus(models.TextChoices):
+        PENDING = "pending", "Pending"
+        READY = "ready", "Ready"
+        FAILED = "failed", "Failed"
 
-class Image(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, unique=True, editable=False)
     user = models.ForeignKey(DefaultUser, on_delete=models.CASCADE)
     upload_datetime = models.DateTimeField(auto_now_add=True)
     update_datetime = models.DateTimeField(auto_now=True)
     filename = models.ImageField(
         upload_to=GenerateRandomFileName("images/originals/"),
-        validators=[FileExtensionValidator(allowed_extensions=settings.ALLOWED_IMAGE_EXTENSIONS), validate_image_min_height]
+        validators=[
+            FileExtensionValidator(allowed_extensions=settings.ALLOWED_IMAGE_EXTENSIONS), validate_image_max_pixels, validate_image_min_height
+        ],
+        db_index=True,
     )
+    thumbnails_status = models.CharField(max_length=10, choices=ThumbnailsStatus.choices, default=ThumbnailsStatus.READY)
+    # sha256 of the original, images with the same content share their files
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
+    # read from the header of the original when it's uploaded, see the `backfill_image_metadata` command for older images
+    width = models.PositiveIntegerField(verbose_name="width in px", null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(verbose_name="height in px", null=True, blank=True, editable=False)
+    format = models.CharField(max_length=10, blank=True, editable=False)
+    size_bytes = models.PositiveBigIntegerField(verbose_name="size in bytes", null=True, blank=True, editable=False)
+    # data URI of a tiny version of the image, shown by clients until a thumbnail is loaded
+    placeholder = models.TextField(blank=True, editable=False)
+    objects = ImageManager()
+
+    class Meta:
+        indexes = [
+            # ordering of the images list, see `KeysetPagination`
+            models.Index(fields=['user', '-upload_datetime', '-id'], name='image_user_upload_keyset'),
+        ]
 
     def __str__(self):
         return f"{self.id}"
@@ -85,85 +264,385 @@ class Image(models.Model):
 
     @property
     def image_tag(self):
-        if thumbnail := self.thumbnail_images.all().order_by('height').first():
-            image_tag_src = thumbnail.filename.url
+        # through the serve views, nginx doesn't expose MEDIA_ROOT
+        if thumbnail := self.thumbnail_images.rendered().order_by('height').first():
+            image_tag_src = thumbnail.image_url
         else:
-            image_tag_src = self.filename.url
+            image_tag_src = self.image_url
         return mark_safe(f'<img src="{image_tag_src}" height="55" />')
 
     def can_be_displayed(self):
         return self.user.useraccounttier.account_tier.can_see_original_img()
 
-    def get_allowed_thumbnails_heights(self):
-        return self.user.useraccounttier.account_tier.allowed_thumbnails_heights
-
-    def create_thumbnails(self):
-        original_image = PIL_Image.open(self.filename.path)
-        original_height = original_image.height
-        original_width = original_image.width
+    def get_serve_record(self) -> dict:
+        '''
+        What `/img/` views need to serve the image, cached by `serve_cache`
+        '''
+        account_tier = self.user.useraccounttier.account_tier
+        return {
+            'path': self.filename.path,
+            'name': self.filename.name,
+            'can_be_displayed': self.can_be_displayed(),
+            'can_see_expiring_img': account_tier.can_see_expiring_img(),
+            'min_resize_height': account_tier.min_resize_height,
+            'max_resize_height': account_tier.max_resize_height,
+        }
 
-        for allowed_thumbnail_height in self.get_allowed_thumbnails_heights():
-            image_to_thumbnail = copy(original_image)
+    def get_allowed_thumbnails_heights(self):
+        return sorted(self.user.useraccounttier.capabilities.allowed_thumbnails_heights)
 
-            # calculate thumbnail size
-            ratio = allowed_thumbnail_height / original_height
-            new_width = int(original_width * ratio)
-            thumbnail_size = (new_width, allowed_thumbnail_height)  # (max_width, max_height)
+    def get_encoder_profiles(self, heights: List[int]) -> Dict[int, dict]:
+        return self.user.useraccounttier.account_tier.get_encoder_profiles(heights)
 
-            image_to_thumbnail.thumbnail(thumbnail_size)
+    def get_missing_thumbnails_heights(self) -> List[int]:
+        rendered_heights = set(self.thumbnail_images.rendered().values_list('height', flat=True))
+        return [height for height in self.get_allowed_thumbnails_heights() if height not in rendered_heights]
 
-            # Create the directory if it doesn't exist
-            thumbnail_dir = 'images/thumb/'
-            os.makedirs(os.path.join(settings.MEDIA_ROOT, thumbnail_dir), exist_ok=True)
-            thumbnail_image_path = GenerateRandomFileName(thumbnail_dir)(filename=self.filename.path)
+    def create_thumbnails(self, heights: Optional[List[int]] = None):
+        if heights is None:
+            heights = self.get_allowed_thumbnails_heights()
+        if not heights:
+            return
 
-            image_to_thumbnail.save(os.path.join(settings.MEDIA_ROOT, thumbnail_image_path))
+        thumbnail_images_paths = get_thumbnail_images_paths(self.filename.path, heights)
+        rendered_thumbnails = render_thumbnails(self.filename.path, {
+            height: os.path.join(settings.MEDIA_ROOT, thumbnail_image_path)
+            for height, thumbnail_image_path in thumbnail_images_paths.items()
+        }, self.get_encoder_profiles(heights))
+        self.save_thumbnails(thumbnail_images_paths, rendered_thumbnails)
+
+    def save_thumbnails(self, thumbnail_images_paths: Dict[int, str], rendered_thumbnails: Dict[int, RenderedThumbnail]):
+        '''
+        Point the thumbnails of given heights at their rendered files, paths are relative to MEDIA_ROOT
+        '''
+        ThumbnailImage.objects.bulk_upsert(self, {
+            height: get_thumbnail_file_fields(thumbnail_image_path, rendered_thumbnails.get(height))
+            for height, thumbnail_image_path in thumbnail_images_paths.items()
+        })
+        if rendered_thumbnails:
+            self.save_placeholder(thumbnail_images_paths[min(rendered_thumbnails)])
+
+    def save_placeholder(self, thumbnail_image_path: str):
+        '''
+        Render the placeholder from a thumbnail (relative to MEDIA_ROOT) unless the image already has one
+        '''
+        if self.placeholder:
+            return
+        self.placeholder = render_placeholder(os.path.join(settings.MEDIA_ROOT, thumbnail_image_path))
+        Image.objects.filter(pk=self.pk).update(placeholder=self.placeholder)
+
+    def create_thumbnail_placeholders(self, heights: List[int]):
+        '''
+        Thumbnails without a file, rendered by the worker or on their first request
+        '''
+        ThumbnailImage.objects.bulk_upsert(self, {height: get_thumbnail_file_fields('') for height in heights})
+
+    def set_file_metadata(self):
+        '''
+        Dimensions, format and size of the original, the header of an upload was already read by its validation
+        '''
+        try:
+            image_probe = probe_image(self.filename)
+            self.size_bytes = self.filename.size
+        except (OSError, PIL_Image.UnidentifiedImageError):
+            # e.g. a missing file assigned in code
+            return
+        self.width, self.height, self.format = image_probe.width, image_probe.height, image_probe.format
+
+    def find_duplicate(self) -> Optional["Image"]:
+        '''
+        Hash the uploaded file and look for an image with the same content, whose file can be shared
+        '''
+        if self.filename._committed:
+            # not an upload, e.g. a path assigned in code
+            return None
+        self.content_hash = get_content_hash(self.filename)
+        # locked, deleting it waits until this image is committed and counted as a reference to the file
+        return Image.objects.select_for_update().filter(content_hash=self.content_hash).exclude(pk=self.pk).exclude(filename='').first()
+
+    def share_thumbnails(self, duplicate: "Image", heights: List[int]) -> List[int]:
+        '''
+        Point thumbnails at the files rendered for the duplicate, returns the heights that were shared
+        '''
+        duplicate_thumbnails = duplicate.thumbnail_images.rendered().filter(height__in=heights)
+        ThumbnailImage.objects.bulk_upsert(self, {
+            duplicate_thumbnail.height: {field: getattr(duplicate_thumbnail, field) for field in ThumbnailImage.FILE_FIELDS}
+            for duplicate_thumbnail in duplicate_thumbnails
+        })
+        return [duplicate_thumbnail.height for duplicate_thumbnail in duplicate_thumbnails]
 
-            thumbnail_image, created = ThumbnailImage.objects.update_or_create(
-                image=self,
-                height=allowed_thumbnail_height,
-                defaults={'filename': thumbnail_image_path}
-            )
+    def save(self, *args, **kwargs) -> None:
+        if not self.filename_has_changed():
+            super().save(*args, **kwargs)
+            return
 
-            thumbnail_image.save()
+        generation_mode = settings.THUMBNAIL_GENERATION_MODE
+        # the duplicate stays locked until the image referencing its file is committed, see `release_files`
+        with transaction.atomic():
+            self.set_file_metadata()
+            duplicate = self.find_duplicate()
+            if duplicate:
+                # reuse the stored file, the upload is never written
+                self.filename = duplicate.filename.name
+                self.placeholder = duplicate.placeholder
+            else:
+                # rendered again from the thumbnails of the new file
+                self.placeholder = ''
+
+            if generation_mode == THUMBNAIL_GENERATION_QUEUED:
+                self.thumbnails_status = self.ThumbnailsStatus.PENDING
+            else:
+                self.thumbnails_status = self.ThumbnailsStatus.READY
+            super().save(*args, **kwargs)
 
-    def filename_has_changed(self):
-        if self.pk:
-            original_obj = Image.objects.filter(pk=self.pk).first()
-            if original_obj and self.filename == original_obj.filename:
-                return False
-        return True
+            heights = self.get_allowed_thumbnails_heights()
+            if duplicate:
+                shared_heights = self.share_thumbnails(duplicate, heights)
+                heights = [height for height in heights if height not in shared_heights]
+
+        if generation_mode == THUMBNAIL_GENERATION_QUEUED:
+            self.create_thumbnail_placeholders(heights)
+            if heights:
+                ThumbnailJob.objects.enqueue(self)
+            else:
+                self.thumbnails_status = self.ThumbnailsStatus.READY
+                Image.objects.filter(pk=self.pk).update(thumbnails_status=self.thumbnails_status)
+        elif generation_mode == THUMBNAIL_GENERATION_LAZY:
+            self.create_thumbnail_placeholders(heights)
+        else:
+            try:
+                self.create_thumbnails(heights)
+            except OSError:
+                # only the header of an upload is validated, e.g. a truncated file fails once its pixels are decoded
+                self.create_thumbnail_placeholders(heights)
+                self.thumbnails_status = self.ThumbnailsStatus.FAILED
+                Image.objects.filter(pk=self.pk).update(thumbnails_status=self.thumbnails_status)
+
+
+def get_thumbnail_file_fields(filename: str, rendered_thumbnail: Optional[RenderedThumbnail] = None) -> dict:
+    '''
+    Values of `ThumbnailImage.FILE_FIELDS` for a file relative to MEDIA_ROOT, an empty filename for placeholders
+    '''
+    if rendered_thumbnail is None:
+        return {'filename': filename, 'width': None, 'format': '', 'size_bytes': None, 'variants': {}}
+    return {
+        'filename': filename,
+        'width': rendered_thumbnail.width,
+        'format': rendered_thumbnail.format,
+        'size_bytes': rendered_thumbnail.size_bytes,
+        'variants': rendered_thumbnail.variants,
+    }
+
+
+def get_accepted_file_path(thumbnail_image_path: str, variants: Dict[str, int], accepted_media_types) -> str:
+    '''
+    Path of the smallest variant of the given media types, or of the thumbnail itself
+    '''
+    # variants are only kept when they are smaller than the thumbnail
+    accepted_variants = {media_type: size for media_type, size in variants.items() if media_type in accepted_media_types}
+    if not accepted_variants:
+        return thumbnail_image_path
+    media_type = min(accepted_variants, key=accepted_variants.get)
+    variant = next(variant for variant, (_, variant_media_type) in THUMBNAIL_VARIANT_FORMATS.items() if variant_media_type == media_type)
+    return get_variant_path(thumbnail_image_path, variant)
+
+
+class ThumbnailImageQuerySet(models.QuerySet):
+    def rendered(self):
+        return self.exclude(filename='')
+
+    def for_serving(self):
+        '''
+        Thumbnails with the account tier of the image owner and whether it includes their height, in a single query
+        '''
+        return self.select_related('image__user__useraccounttier__account_tier').annotate(
+            is_allowed_height=models.Exists(ThumbnailSize.objects.filter(
+                tiers=models.OuterRef('image__user__useraccounttier__account_tier'), height=models.OuterRef('height')
+            ))
+        )
 
-    def save(self, *args, **kwargs) -> None:
-        if self.filename_has_changed():
-            super().save(*args, **kwargs)
-            self.create_thumbnails()
+    def bulk_upsert(self, image: Image, thumbnail_images_files: Dict[int, dict]):
+        '''
+        Insert or update thumbnails of the image in a single query, `thumbnail_images_files` maps heights to values of `FILE_FIELDS`
+        '''
+        if not thumbnail_images_files:
             return
-        super().save(*args, **kwargs)
+        replaced_thumbnail_images = list(self.filter(image=image, height__in=thumbnail_images_files).values_list('id', 'filename'))
+        self.bulk_create(
+            [
+                ThumbnailImage(image=image, height=height, **file_fields)
+                for height, file_fields in thumbnail_images_files.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['image', 'height'],
+            update_fields=ThumbnailImage.FILE_FIELDS + ['update_datetime'],
+        )
+        # bulk_create sends no signals, the files are released and cached records invalidated here
+        release_files(*[filename for _, filename in replaced_thumbnail_images])
+        serve_cache.invalidate('thumbnail', *[thumbnail_image_id for thumbnail_image_id, _ in replaced_thumbnail_images])
 
 
-class ThumbnailImage(models.Model):
+@cleanup.ignore
+class ThumbnailImage(StoredFilenameMixin, models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, unique=True, editable=False)
     image = models.ForeignKey(Image, on_delete=models.CASCADE, related_name="thumbnail_images")
     height = models.IntegerField()
     upload_datetime = models.DateTimeField(auto_now_add=True)
     update_datetime = models.DateTimeField(auto_now=True)
-    filename = models.ImageField(upload_to=GenerateRandomFileName("images/thumb/"))
+    filename = models.ImageField(upload_to=GenerateRandomFileName(THUMBNAIL_DIR), blank=True, db_index=True)
+    # media type -> size in bytes of the variants stored next to the file, e.g. `{"image/webp": 1234}`
+    variants = models.JSONField(default=dict, blank=True)
+    width = models.PositiveIntegerField(verbose_name="width in px", null=True, blank=True, editable=False)
+    format = models.CharField(max_length=10, blank=True, editable=False)
+    size_bytes = models.PositiveBigIntegerField(verbose_name="size in bytes", null=True, blank=True, editable=False)
+    objects = ThumbnailImageQuerySet.as_manager()
+
+    # fields describing the rendered file, empty for placeholders
+    FILE_FIELDS = ['filename', 'width', 'format', 'size_bytes', 'variants']
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['image', 'height'], name='unique_thumbnail_image_height'),
+        ]
 
     def __str__(self):
         return f"{self.id}"
 
+    @property
+    def is_rendered(self):
+        return bool(self.filename)
+
+    def render(self):
+        '''
+        Render the file of a placeholder thumbnail, concurrent calls wait for the first one and reuse its file
+        '''
+        with coalesce_renders(str(self.pk)), transaction.atomic():
+            # the row lock makes requests of other processes wait as well
+            thumbnail_image = ThumbnailImage.objects.select_for_update().select_related('image').get(pk=self.pk)
+            if not thumbnail_image.is_rendered:
+                original_path = thumbnail_image.image.filename.path
+                thumbnail_image_path = get_thumbnail_images_paths(original_path, [self.height])[self.height]
+                rendered_thumbnails = render_thumbnails(
+                    original_path,
+                    {self.height: os.path.join(settings.MEDIA_ROOT, thumbnail_image_path)},
+                    thumbnail_image.image.get_encoder_profiles([self.height])
+                )
+                for field, value in get_thumbnail_file_fields(thumbnail_image_path, rendered_thumbnails[self.height]).items():
+                    setattr(thumbnail_image, field, value)
+                thumbnail_image.save(update_fields=self.FILE_FIELDS + ['update_datetime'])
+                thumbnail_image.image.save_placeholder(thumbnail_image_path)
+        for field in self.FILE_FIELDS:
+            setattr(self, field, getattr(thumbnail_image, field))
+
+    def get_file_path(self, accepted_media_types) -> str:
+        return get_accepted_file_path(self.filename.path, self.variants, accepted_media_types)
+
+    def get_serve_record(self) -> dict:
+        '''
+        What `/img/thumb/` views need to serve the thumbnail, cached by `serve_cache`
+        '''
+        return {
+            'path': self.filename.path if self.is_rendered else '',
+            'variants': self.variants,
+            'can_be_displayed': self.can_be_displayed(),
+        }
+
     @property
     def image_tag(self):
-        smallest_thumbnail = self.image.thumbnail_images.all().order_by('height').first()
-        return mark_safe(f'<img src="{smallest_thumbnail.filename.url}" height="55" />')
+        return self.image.image_tag
 
     @property
     def image_url(self):
         return f"/img/thumb/{self.id}/"
 
     def can_be_displayed(self):
-        return self.height in self.image.user.useraccounttier.account_tier.allowed_thumbnails_heights
+        # annotated by `for_serving`
+        if hasattr(self, 'is_allowed_height'):
+            return self.is_allowed_height
+        return self.height in self.image.user.useraccounttier.capabilities.allowed_thumbnails_heights
+
+
+class ThumbnailJobManager(models.Manager):
+    def enqueue(self, image):
+        '''
+        Reset the pending or failed jobs of the image, an image replaced while its job was running can have several
+        '''
+        now = timezone.now()
+        reset = self.filter(image=image, status__in=(ThumbnailJob.Status.PENDING, ThumbnailJob.Status.FAILED)).update(
+            status=ThumbnailJob.Status.PENDING, attempts=0, available_at=now, last_error='', update_datetime=now
+        )
+        if not reset:
+            self.create(image=image)
+
+    def claim(self, worker_name: str, limit: int = 1) -> List["ThumbnailJob"]:
+        '''
+        Lock up to `limit` jobs for the worker, including running jobs whose visibility timeout has passed
+        '''
+        now = timezone.now()
+        claimable = (
+            models.Q(status=ThumbnailJob.Status.PENDING, available_at__lte=now)
+            | models.Q(status=ThumbnailJob.Status.RUNNING, locked_until__lt=now)
+        )
+        with transaction.atomic():
+            jobs = list(
+                self.select_for_update(skip_locked=True).filter(claimable).order_by('available_at')[:limit]
+            )
+            for job in jobs:
+                job.status = ThumbnailJob.Status.RUNNING
+                job.attempts += 1
+                job.locked_by = worker_name
+                job.locked_until = now + timedelta(seconds=THUMBNAIL_JOB_VISIBILITY_TIMEOUT)
+                job.save(update_fields=['status', 'attempts', 'locked_by', 'locked_until', 'update_datetime'])
+        return jobs
+
+
+class ThumbnailJob(models.Model):
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    image = models.ForeignKey(Image, on_delete=models.CASCADE, related_name="thumbnail_jobs")
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=255, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    creation_datetime = models.DateTimeField(auto_now_add=True)
+    update_datetime = models.DateTimeField(auto_now=True)
+    objects = ThumbnailJobManager()
+
+    def __str__(self):
+        return f"{self.image_id} ({self.status})"
+
+    def run(self):
+        try:
+            self.image.create_thumbnails(self.image.get_missing_thumbnails_heights())
+        except Exception as error:
+            self.mark_failed(error)
+            raise
+        self.mark_done()
+
+    def mark_done(self):
+        self.status = self.Status.DONE
+        self.locked_until = None
+        self.last_error = ''
+        self.save(update_fields=['status', 'locked_until', 'last_error', 'update_datetime'])
+        Image.objects.filter(pk=self.image_id).update(thumbnails_status=Image.ThumbnailsStatus.READY)
+
+    def mark_failed(self, error: Exception):
+        self.last_error = repr(error)
+        self.locked_until = None
+        if self.attempts >= THUMBNAIL_JOB_MAX_ATTEMPTS:
+            self.status = self.Status.FAILED
+            Image.objects.filter(pk=self.image_id).update(thumbnails_status=Image.ThumbnailsStatus.FAILED)
+        else:
+            self.status = self.Status.PENDING
+            self.available_at = timezone.now() + timedelta(seconds=THUMBNAIL_JOB_RETRY_DELAY * self.attempts)
+        self.save(update_fields=['status', 'available_at', 'locked_until', 'last_error', 'update_datetime'])
 
 
 class ExpiringImageManager(models.Manager):
@@ -173,6 +652,9 @@ class ExpiringImageManager(models.Manager):
     def expired(self):
         return self.filter(expiration_datetime__lt=timezone.now())
 
+    def for_serving(self):
+        return self.select_related('image__user__useraccounttier__account_tier')
+
 
 class ExpiringImage(models.Model):
 
@@ -189,6 +671,12 @@ class ExpiringImage(models.Model):
         )
     objects = ExpiringImageManager()
 
+    class Meta:
+        indexes = [
+            # ordering of the expiring images list, see `KeysetPagination`
+            models.Index(fields=['image', '-expiration_datetime', '-creation_datetime', '-id'], name='expiring_image_keyset'),
+        ]
+
     def __str__(self):
         return f"{self.id}"
 
@@ -199,19 +687,33 @@ class ExpiringImage(models.Model):
         check = timezone.now() > self.expiration_datetime
         return check
 
+    def get_remaining_lifetime(self) -> int:
+        '''
+        Seconds until the link expires
+        '''
+        return max(int((self.expiration_datetime - timezone.now()).total_seconds()), 0)
+
     @property
     def image_tag(self):
-        if thumbnail := self.image.thumbnail_images.all().order_by('height').first():
-            image_tag_src = thumbnail.filename.url
-        else:
-            image_tag_src = self.image.filename.url
-        return mark_safe(f'<img src="{image_tag_src}" height="55" />')
+        return self.image.image_tag
 
     def can_be_displayed(self):
         return self.image.user.useraccounttier.account_tier.can_see_expiring_img()
 
+    def get_serve_record(self) -> dict:
+        '''
+        What `/img/temp/` views need to serve the image, cached by `serve_cache`
+        '''
+        return {
+            'path': self.image.filename.path,
+            'can_be_displayed': self.can_be_displayed(),
+            'expiration_timestamp': self.expiration_datetime.timestamp(),
+        }
+
     @property
     def image_url(self):
+        if settings.SIGNED_EXPIRING_LINKS:
+            return f"/img/temp/s/{signed_links.sign(self)}/"
         return f"/img/temp/{self.id}/"
 
     def save(self, *args, **kwargs) -> None:
@@ -221,4 +723,39 @@ class ExpiringImage(models.Model):
         else:
             base_time = timezone.now()
         self.expiration_datetime = base_time + time_delta
+        is_update = not self._state.adding
         super().save(*args, **kwargs)
+        if is_update:
+            # signed links issued before embed the previous expiration
+            signed_links.revoke(self, int(self.expiration_datetime.timestamp()))
+
+
+class RevokedSignedLink(models.Model):
+    '''
+    Signed links of the expiring image issued before it was changed or deleted, see `signed_links.revoke`
+    '''
+    # not a foreign key, the row outlives a deleted expiring image
+    expiring_image_id = models.UUIDField(primary_key=True)
+    # expiration of the only link still valid, 0 when none is
+    valid_expires = models.BigIntegerField(default=0)
+    # the longest possible link of the expiring image has expired by then, the row can be deleted
+    keep_until = models.DateTimeField(db_index=True)
+
+
+def release_files(*names: str):
+    '''
+    Delete the stored files after the commit, unless other images or thumbnails still reference them
+    '''
+    def delete_unreferenced_files():
+        for name in set(filter(None, names)):
+            with transaction.atomic():
+                # waits for uploads that locked an image with the file in `find_duplicate` to commit
+                list(Image.objects.select_for_update().filter(filename=name).only('pk'))
+                references = Image.objects.filter(filename=name).count() + ThumbnailImage.objects.filter(filename=name).count()
+            if not references:
+                default_storage.delete(name)
+                if name.startswith(THUMBNAIL_DIR):
+                    for variant in THUMBNAIL_VARIANT_FORMATS:
+                        default_storage.delete(get_variant_path(name, variant))
+
+    transaction.on_commit(delete_unreferenced_files)
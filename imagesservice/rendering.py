@@ -0,0 +1,234 @@
+import multiprocessing
+import os
+import threading
+from base64 import b64encode
+from io import BytesIO
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+from PIL import Image as PIL_Image
+from django.conf import settings
+from .config import IMAGE_PLACEHOLDER_QUALITY, IMAGE_PLACEHOLDER_SIZE, THUMBNAIL_VARIANT_FORMATS
+
+try:
+    import pillow_avif  # noqa: F401 registers the AVIF plugin
+except ImportError:
+    pass
+
+
+# decode and reduce to at least this many times the target size before the final resampling, see `PIL.Image.thumbnail`
+REDUCING_GAP = 2.0
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# key -> [lock, number of threads using it]
+_render_locks: Dict[str, list] = {}
+_render_locks_lock = threading.Lock()
+
+
+class RenderedThumbnail(NamedTuple):
+    width: int
+    format: str
+    size_bytes: int
+    # media type -> size in bytes of the variants smaller than the thumbnail
+    variants: Dict[str, int]
+
+
+def get_thumbnail_size(original_size: Tuple[int, int], height: int) -> Tuple[int, int]:
+    original_width, original_height = original_size
+    ratio = height / original_height
+    new_width = max(int(original_width * ratio), 1)
+    return (new_width, height)  # (max_width, max_height)
+
+
+def get_variant_formats() -> Tuple[str, ...]:
+    '''
+    Configured variant formats the installed Pillow is able to encode
+    '''
+    PIL_Image.init()
+    return tuple(
+        variant for variant in settings.THUMBNAIL_VARIANTS
+        if variant in THUMBNAIL_VARIANT_FORMATS and THUMBNAIL_VARIANT_FORMATS[variant][0] in PIL_Image.SAVE
+    )
+
+
+def get_variant_path(path: str, variant: str) -> str:
+    return f"{os.path.splitext(path)[0]}.{variant}"
+
+
+def get_save_options(image: PIL_Image.Image, image_format: str, encoder_profile: Optional[dict]) -> dict:
+    '''
+    Keyword arguments of `PIL.Image.save` for the format, Pillow defaults without an encoder profile
+    '''
+    if not encoder_profile:
+        return {}
+
+    # the ICC profile is kept even when stripping metadata, colors would shift without it
+    save_options = {'icc_profile': image.info.get('icc_profile')}
+    if not encoder_profile['strip_metadata'] and image.info.get('exif'):
+        save_options['exif'] = image.info['exif']
+
+    image_format = (image_format or '').upper()
+    if image_format == 'JPEG':
+        save_options.update(quality=encoder_profile['quality'], progressive=encoder_profile['progressive'],
+                            optimize=encoder_profile['optimize'])
+        if encoder_profile['subsampling']:
+            save_options['subsampling'] = encoder_profile['subsampling']
+    elif image_format == 'PNG':
+        save_options.update(optimize=encoder_profile['optimize'], compress_level=encoder_profile['png_compress_level'])
+    elif image_format in ('WEBP', 'AVIF'):
+        save_options.update(quality=encoder_profile['quality'])
+    return save_options
+
+
+def save_thumbnail(image_to_thumbnail: PIL_Image.Image, destination_path: str, image_format: Optional[str],
+                   variants: Iterable[str] = (), encoder_profile: Optional[dict] = None) -> RenderedThumbnail:
+    '''
+    Save the thumbnail and its variants in modern formats, only the variants smaller than the thumbnail are kept
+    '''
+    image_to_thumbnail.save(destination_path, format=image_format, **get_save_options(image_to_thumbnail, image_format, encoder_profile))
+    thumbnail_size = os.path.getsize(destination_path)
+
+    variants_sizes = {}
+    for variant in variants:
+        pil_format, media_type = THUMBNAIL_VARIANT_FORMATS[variant]
+        variant_image = image_to_thumbnail
+        if variant_image.mode not in ('RGB', 'RGBA'):
+            has_transparency = 'A' in variant_image.getbands() or 'transparency' in variant_image.info
+            variant_image = variant_image.convert('RGBA' if has_transparency else 'RGB')
+
+        variant_path = get_variant_path(destination_path, variant)
+        variant_image.save(variant_path, format=pil_format, **get_save_options(variant_image, pil_format, encoder_profile))
+        variant_size = os.path.getsize(variant_path)
+        if variant_size < thumbnail_size:
+            variants_sizes[media_type] = variant_size
+        else:
+            os.remove(variant_path)
+    return RenderedThumbnail(image_to_thumbnail.width, image_format or '', thumbnail_size, variants_sizes)
+
+
+def render_thumbnail(source_path: str, height: int, destination_path: str, variants: Iterable[str] = (),
+                     encoder_profile: Optional[dict] = None) -> RenderedThumbnail:
+    '''
+    Resize the image to the given height and save it, runs inside the worker processes
+    '''
+    with PIL_Image.open(source_path) as image_to_thumbnail:
+        # `thumbnail` decodes JPEGs in draft mode, directly at a reduced scale
+        image_to_thumbnail.thumbnail(get_thumbnail_size(image_to_thumbnail.size, height), reducing_gap=REDUCING_GAP)
+        return save_thumbnail(image_to_thumbnail, destination_path, image_to_thumbnail.format, variants, encoder_profile)
+
+
+def render_thumbnails_cascade(source_path: str, destination_paths: Dict[int, str], variants: Iterable[str] = (),
+                              encoder_profiles: Optional[Dict[int, dict]] = None) -> Dict[int, RenderedThumbnail]:
+    '''
+    Decode the source image once and derive every thumbnail from the next larger one
+    '''
+    encoder_profiles = encoder_profiles or {}
+    heights = sorted(destination_paths, reverse=True)
+
+    with PIL_Image.open(source_path) as original_image:
+        original_size = original_image.size
+        largest_width, largest_height = get_thumbnail_size(original_size, heights[0])
+
+        # JPEGs get decoded at 1/2, 1/4 or 1/8 scale, as long as it stays above the reducing gap of the largest thumbnail
+        original_image.draft(None, (int(largest_width * REDUCING_GAP), int(largest_height * REDUCING_GAP)))
+        image_to_thumbnail = original_image.copy()
+
+    rendered_thumbnails = {}
+    for height in heights:
+        thumbnail_size = get_thumbnail_size(original_size, height)
+        if image_to_thumbnail.height > height:
+            image_to_thumbnail = image_to_thumbnail.resize(thumbnail_size, PIL_Image.Resampling.BICUBIC, reducing_gap=REDUCING_GAP)
+        rendered_thumbnails[height] = save_thumbnail(
+            image_to_thumbnail, destination_paths[height], original_image.format, variants, encoder_profiles.get(height)
+        )
+    return rendered_thumbnails
+
+
+def render_placeholder(source_path: str) -> str:
+    '''
+    Tiny blurry version of the image as a data URI, rendered from the smallest thumbnail
+    '''
+    with PIL_Image.open(source_path) as image:
+        image.thumbnail((IMAGE_PLACEHOLDER_SIZE, IMAGE_PLACEHOLDER_SIZE), reducing_gap=REDUCING_GAP)
+        placeholder_image = image.convert('RGB')
+    placeholder = BytesIO()
+    placeholder_image.save(placeholder, format='JPEG', quality=IMAGE_PLACEHOLDER_QUALITY, optimize=True)
+    return f"data:image/jpeg;base64,{b64encode(placeholder.getvalue()).decode()}"
+
+
+def get_executor() -> Optional[ProcessPoolExecutor]:
+    '''
+    Process pool shared by all requests of this process, `None` when rendering in parallel is disabled
+    '''
+    global _executor
+
+    if settings.THUMBNAIL_RENDER_WORKERS < 1:
+        return None
+
+    with _executor_lock:
+        if _executor is None:
+            # spawned workers don't inherit locks held by the threads of the web server
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.THUMBNAIL_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def reset_executor():
+    global _executor
+
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def render_thumbnails(source_path: str, destination_paths: Dict[int, str],
+                      encoder_profiles: Optional[Dict[int, dict]] = None) -> Dict[int, RenderedThumbnail]:
+    '''
+    Render thumbnails of the source image, `destination_paths` maps heights to absolute paths
+    and `encoder_profiles` heights to the options of `EncoderProfile.as_options`.
+    Returns dimensions, format and sizes of the rendered files by height.
+    '''
+    encoder_profiles = encoder_profiles or {}
+    executor = get_executor()
+    variants = get_variant_formats()
+
+    if not destination_paths:
+        return {}
+
+    if executor is None or len(destination_paths) < 2:
+        return render_thumbnails_cascade(source_path, destination_paths, variants, encoder_profiles)
+
+    try:
+        futures = {
+            height: executor.submit(render_thumbnail, source_path, height, destination_path, variants, encoder_profiles.get(height))
+            for height, destination_path in destination_paths.items()
+        }
+        return {height: future.result() for height, future in futures.items()}
+    except BrokenProcessPool:
+        # a worker died (e.g. killed by the OOM killer), start a fresh pool next time and render here
+        reset_executor()
+        return render_thumbnails_cascade(source_path, destination_paths, variants, encoder_profiles)
+
+
+@contextmanager
+def coalesce_renders(key: str):
+    '''
+    Let a single thread of the process render `key` at a time, the others wait and reuse its result
+    '''
+    with _render_locks_lock:
+        render_lock = _render_locks.setdefault(key, [threading.Lock(), 0])
+        render_lock[1] += 1
+    try:
+        with render_lock[0]:
+            yield
+    finally:
+        with _render_locks_lock:
+            render_lock[1] -= 1
+            if not render_lock[1]:
+                del _render_locks[key]
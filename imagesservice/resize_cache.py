@@ -0,0 +1,133 @@
+import hashlib
+import os
+import uuid
+from typing import Dict, Optional
+from django.conf import settings
+from django.core.cache import cache
+from .config import RESIZE_CACHE_DIR
+from .rendering import coalesce_renders, render_thumbnail
+
+
+HITS_KEY = 'resize_cache_hits'
+MISSES_KEY = 'resize_cache_misses'
+BYTES_KEY = 'resize_cache_bytes'
+
+
+def get_cache_dir() -> str:
+    return os.path.join(settings.MEDIA_ROOT, RESIZE_CACHE_DIR)
+
+
+def get_cache_path(source_name: str, height: int) -> str:
+    '''
+    Path of the resized image, images sharing their original share its resized images as well
+    '''
+    source_hash = hashlib.sha256(source_name.encode()).hexdigest()[:32]
+    extension = os.path.splitext(source_name)[1]
+    return os.path.join(get_cache_dir(), f"{source_hash}_{height}{extension}")
+
+
+def increment_counter(key: str):
+    # `incr` fails on a missing key, `add` sets it only when missing
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # evicted between `add` and `incr`
+        cache.set(key, 1, None)
+
+
+def add_cached_bytes(size: int) -> Optional[int]:
+    '''
+    Tracked size of the cache with `size` more bytes, None while it isn't tracked yet (e.g. after the cache was cleared)
+    '''
+    try:
+        return cache.incr(BYTES_KEY, size)
+    except ValueError:
+        return None
+
+
+def get_resized_image_path(source_path: str, source_name: str, height: int) -> str:
+    '''
+    Path of the source image resized to the given height, rendered on a cache miss
+    '''
+    cache_path = get_cache_path(source_name, height)
+    with coalesce_renders(cache_path):
+        if os.path.exists(cache_path):
+            # the modification time orders the least recently used images for eviction
+            os.utime(cache_path)
+            increment_counter(HITS_KEY)
+            return cache_path
+
+        increment_counter(MISSES_KEY)
+        os.makedirs(get_cache_dir(), exist_ok=True)
+        # rendered next to the cache path and renamed, other processes never serve a partially written file
+        temporary_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            render_thumbnail(source_path, height, temporary_path)
+            os.replace(temporary_path, cache_path)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+        cached_bytes = add_cached_bytes(os.path.getsize(cache_path))
+
+    # the directory is only listed when the tracked size exceeds the budget, `evict` corrects it with the actual size
+    if cached_bytes is None or cached_bytes > settings.RESIZE_CACHE_MAX_BYTES:
+        evict(settings.RESIZE_CACHE_MAX_BYTES, keep=cache_path)
+    return cache_path
+
+
+def get_cached_files() -> list:
+    '''
+    (modification time, size, path) of the cached images, the least recently used first
+    '''
+    try:
+        entries = list(os.scandir(get_cache_dir()))
+    except FileNotFoundError:
+        return []
+
+    cached_files = []
+    for entry in entries:
+        if entry.name.endswith('.tmp'):
+            continue
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            # evicted by another process
+            continue
+        cached_files.append((stat.st_mtime, stat.st_size, entry.path))
+    return sorted(cached_files)
+
+
+def evict(max_bytes: int, keep: Optional[str] = None) -> int:
+    '''
+    Delete the least recently used images until the cache fits in `max_bytes`, except the `keep` one about to be served,
+    and track the size left. Returns the number of deleted images.
+    '''
+    cached_files = get_cached_files()
+    total_bytes = sum(size for _, size, _ in cached_files)
+    evicted = 0
+    for _, size, path in cached_files:
+        if total_bytes <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_bytes -= size
+        evicted += 1
+    cache.set(BYTES_KEY, total_bytes, None)
+    return evicted
+
+
+def get_stats() -> Dict[str, int]:
+    cached_files = get_cached_files()
+    return {
+        'files': len(cached_files),
+        'bytes': sum(size for _, size, _ in cached_files),
+        'max_bytes': settings.RESIZE_CACHE_MAX_BYTES,
+        'hits': cache.get(HITS_KEY, 0),
+        'misses': cache.get(MISSES_KEY, 0),
+    }
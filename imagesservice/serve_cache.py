@@ -0,0 +1,86 @@
+import uuid
+from typing import Awaitable, Callable, Optional
+from django.core.cache import cache
+from django.db import transaction
+from .config import SERVE_CACHE_TIMEOUT, SERVE_CACHE_NEGATIVE_TIMEOUT
+
+
+GENERATION_KEY = 'serve_generation'
+
+# cached for ids without a servable object, saves querying them again
+MISSING = 'missing'
+
+
+def get_generation() -> str:
+    '''
+    Part of every record key, records of older generations are never read again
+    '''
+    # random instead of a counter, a generation evicted from the cache can't come back with its stale records
+    return cache.get_or_set(GENERATION_KEY, lambda: uuid.uuid4().hex, None)
+
+
+def set_generation():
+    cache.set(GENERATION_KEY, uuid.uuid4().hex, None)
+
+
+def bump_generation():
+    '''
+    Invalidate all records, e.g. after an account tier changed
+    '''
+    set_generation()
+    # and after the commit, a request in between could have cached the rows from before it
+    transaction.on_commit(set_generation)
+
+
+def get_record_key(kind: str, object_id) -> str:
+    return f"serve:{get_generation()}:{kind}:{object_id}"
+
+
+def get_record(kind: str, object_id, load: Callable[[str], Optional[dict]]) -> Optional[dict]:
+    '''
+    Data needed to serve the object, `load` reads it from the database on a cache miss and returns `None` for unknown ids
+    '''
+    key = get_record_key(kind, object_id)
+    record = cache.get(key)
+    if record is None:
+        record = load(object_id)
+        if record is None:
+            cache.set(key, MISSING, SERVE_CACHE_NEGATIVE_TIMEOUT)
+            return None
+        cache.set(key, record, SERVE_CACHE_TIMEOUT)
+    if record == MISSING:
+        return None
+    return record
+
+
+async def aget_generation() -> str:
+    return await cache.aget_or_set(GENERATION_KEY, lambda: uuid.uuid4().hex, None)
+
+
+async def aget_record(kind: str, object_id, load: Callable[[str], Awaitable[Optional[dict]]]) -> Optional[dict]:
+    '''
+    `get_record` for async views, `load` is a coroutine function
+    '''
+    key = f"serve:{await aget_generation()}:{kind}:{object_id}"
+    record = await cache.aget(key)
+    if record is None:
+        record = await load(object_id)
+        if record is None:
+            await cache.aset(key, MISSING, SERVE_CACHE_NEGATIVE_TIMEOUT)
+            return None
+        await cache.aset(key, record, SERVE_CACHE_TIMEOUT)
+    if record == MISSING:
+        return None
+    return record
+
+
+def delete_records(kind: str, object_ids):
+    cache.delete_many([get_record_key(kind, object_id) for object_id in object_ids])
+
+
+def invalidate(kind: str, *object_ids):
+    if not object_ids:
+        return
+    delete_records(kind, object_ids)
+    # and after the commit, a request in between could have cached the rows from before it
+    transaction.on_commit(lambda: delete_records(kind, object_ids))
@@ -0,0 +1,80 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+from . import serve_cache, signed_links, tier_capabilities
+from .models import (AccountTier, ExpiringImage, Image, ThumbnailImage, ThumbnailSize, UserAccountTier, get_stored_filename,
+                     release_files)
+
+
+@receiver(post_save, sender=Image)
+@receiver(post_save, sender=ThumbnailImage)
+def release_replaced_file(sender, instance, raw, **kwargs):
+    if raw:
+        return
+    filename = get_stored_filename(instance)
+    if instance._stored_filename and instance._stored_filename != filename:
+        release_files(instance._stored_filename)
+        if sender is Image:
+            # records of expiring images hold the path of the original
+            serve_cache.invalidate('temp', *instance.expiring_images.values_list('pk', flat=True))
+    instance._stored_filename = filename
+
+
+@receiver(post_delete, sender=Image)
+@receiver(post_delete, sender=ThumbnailImage)
+def release_deleted_file(sender, instance, **kwargs):
+    release_files(get_stored_filename(instance))
+
+
+@receiver(post_save, sender=Image)
+@receiver(post_delete, sender=Image)
+def invalidate_image_record(sender, instance, **kwargs):
+    serve_cache.invalidate('image', instance.pk)
+
+
+@receiver(post_save, sender=ThumbnailImage)
+@receiver(post_delete, sender=ThumbnailImage)
+def invalidate_thumbnail_image_record(sender, instance, **kwargs):
+    serve_cache.invalidate('thumbnail', instance.pk)
+
+
+@receiver(post_save, sender=ExpiringImage)
+@receiver(post_delete, sender=ExpiringImage)
+def invalidate_temp_image_record(sender, instance, **kwargs):
+    serve_cache.invalidate('temp', instance.pk)
+
+
+@receiver(post_delete, sender=ExpiringImage)
+def revoke_signed_links(sender, instance, **kwargs):
+    signed_links.revoke(instance)
+
+
+# records of all images of a tier's users depend on it, they are all invalidated at once
+@receiver(post_save, sender=AccountTier)
+@receiver(post_delete, sender=AccountTier)
+@receiver(post_save, sender=ThumbnailSize)
+@receiver(post_delete, sender=ThumbnailSize)
+@receiver(post_save, sender=UserAccountTier)
+@receiver(post_delete, sender=UserAccountTier)
+@receiver(m2m_changed, sender=ThumbnailSize.tiers.through)
+def invalidate_all_records(sender, **kwargs):
+    serve_cache.bump_generation()
+
+
+@receiver(post_save, sender=AccountTier)
+@receiver(post_delete, sender=AccountTier)
+@receiver(post_save, sender=ThumbnailSize)
+@receiver(post_delete, sender=ThumbnailSize)
+@receiver(m2m_changed, sender=ThumbnailSize.tiers.through)
+def invalidate_tier_capabilities(sender, **kwargs):
+    tier_capabilities.invalidate()
+    # and after the commit, another process could have loaded the rows of the transaction before it
+    transaction.on_commit(tier_capabilities.invalidate)
+
+
+@receiver(post_save, sender=ThumbnailSize)
+@receiver(post_delete, sender=ThumbnailSize)
+def refresh_max_thumbnail_height(sender, **kwargs):
+    # dropped right away, a rolled back change isn't written to the cache
+    ThumbnailSize.objects.invalidate_max_height()
+    transaction.on_commit(ThumbnailSize.objects.refresh_max_height)
@@ -0,0 +1,74 @@
+import random
+from datetime import timedelta
+from typing import NamedTuple, Optional
+from django.apps import apps
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+from . import serve_cache
+from .config import EXPIRE_AFTER_MAX, REVOKED_LINKS_PURGE_PROBABILITY
+
+
+SALT = 'imagesservice.signed_links'
+VARIANT_ORIGINAL = 'original'
+
+
+class SignedLink(NamedTuple):
+    expiring_image_id: str
+    image_id: str
+    variant: str
+    expires: int
+
+
+def get_signer() -> signing.Signer:
+    '''
+    Signs with the first of EXPIRING_LINK_SIGNING_KEYS and accepts the others, so keys can be rotated
+    without invalidating issued links; SECRET_KEY (and SECRET_KEY_FALLBACKS) without them
+    '''
+    keys = settings.EXPIRING_LINK_SIGNING_KEYS
+    return signing.Signer(key=keys[0] if keys else None, fallback_keys=keys[1:] if keys else None, salt=SALT, algorithm='sha256')
+
+
+def sign(expiring_image) -> str:
+    link = SignedLink(str(expiring_image.id), str(expiring_image.image_id), VARIANT_ORIGINAL, int(expiring_image.expiration_datetime.timestamp()))
+    return get_signer().sign_object(list(link))
+
+
+def verify(token: str) -> Optional[SignedLink]:
+    '''
+    The link encoded in the token, `None` when the signature doesn't match any of the keys
+    '''
+    try:
+        return SignedLink(*get_signer().unsign_object(token))
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+
+
+def revoke(expiring_image, expires: int = 0):
+    '''
+    Deny links of the expiring image except the one expiring at `expires`, all of them with the default.
+    Stored in the database, every process sees it and it survives restarts.
+    '''
+    RevokedSignedLink = apps.get_model('imagesservice.RevokedSignedLink')
+    if random.random() < REVOKED_LINKS_PURGE_PROBABILITY:
+        RevokedSignedLink.objects.filter(keep_until__lt=timezone.now()).delete()
+    RevokedSignedLink.objects.update_or_create(expiring_image_id=expiring_image.id, defaults={
+        'valid_expires': expires,
+        'keep_until': expiring_image.creation_datetime + timedelta(seconds=EXPIRE_AFTER_MAX),
+    })
+    serve_cache.invalidate('revoked', expiring_image.id)
+
+
+def load_revocation_record(expiring_image_id: str) -> dict:
+    RevokedSignedLink = apps.get_model('imagesservice.RevokedSignedLink')
+    valid_expires = RevokedSignedLink.objects.filter(expiring_image_id=expiring_image_id).values_list('valid_expires', flat=True).first()
+    # cached for links that aren't revoked as well
+    return {'valid_expires': valid_expires}
+
+
+def is_revoked(link: SignedLink) -> bool:
+    '''
+    Looked up only for links with a valid signature and expiration, cached by `serve_cache`
+    '''
+    valid_expires = serve_cache.get_record('revoked', link.expiring_image_id, load_revocation_record)['valid_expires']
+    return valid_expires is not None and valid_expires != link.expires
@@ -0,0 +1,55 @@
+import threading
+import uuid
+from typing import Callable, Dict, FrozenSet, NamedTuple, Optional
+from django.core.cache import cache
+
+
+VERSION_KEY = 'tier_capabilities_version'
+
+
+class TierCapabilities(NamedTuple):
+    can_see_original_img: bool
+    can_see_expiring_img: bool
+    allowed_thumbnails_heights: FrozenSet[int]
+
+
+# account tier id -> capabilities, read by all threads of the process
+_snapshots: Dict[int, TierCapabilities] = {}
+_snapshots_version: Optional[str] = None
+_snapshots_lock = threading.Lock()
+
+
+def get_version() -> str:
+    '''
+    Version of the tiers in the shared cache, snapshots of other versions are dropped
+    '''
+    return cache.get_or_set(VERSION_KEY, lambda: uuid.uuid4().hex, None)
+
+
+def get(account_tier_id: int, load: Callable[[int], TierCapabilities]) -> TierCapabilities:
+    '''
+    Snapshot of the tier kept in the memory of the process, `load` reads it from the database when it's missing or outdated
+    '''
+    global _snapshots_version
+
+    version = get_version()
+    with _snapshots_lock:
+        if version != _snapshots_version:
+            _snapshots.clear()
+            _snapshots_version = version
+        capabilities = _snapshots.get(account_tier_id)
+
+    if capabilities is None:
+        capabilities = load(account_tier_id)
+        with _snapshots_lock:
+            # tiers changed while loading, the snapshot may be already outdated
+            if version == _snapshots_version:
+                _snapshots[account_tier_id] = capabilities
+    return capabilities
+
+
+def invalidate():
+    '''
+    Outdate the snapshots of all processes, they reload them on their next use
+    '''
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
@@ -1,12 +1,18 @@
+from django.conf import settings
 from django.urls import include, path, re_path
-from . import views
+from . import async_views, views
 
 
 UUID4_REGEX = '[0-9a-f]{8}-[0-9a-f]{4}-4[0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12}'
 
+serve_views = async_views if settings.ASYNC_SERVE_VIEWS else views
+
 urlpatterns = [
     path("api/", include("imagesservice.api.urls")),
-    re_path(rf"img/(?P<image_id>{UUID4_REGEX})/", views.serve_image, name="serve_image"),
-    re_path(rf"img/thumb/(?P<image_id>{UUID4_REGEX})/", views.serve_thumbnail_image, name="serve_thumbnail_image"),
-    re_path(rf"img/temp/(?P<image_id>{UUID4_REGEX})/", views.serve_temp_image, name="serve_temp_image"),
+    # before `serve_image`, whose pattern matches the beginning of this one
+    re_path(rf"img/(?P<image_id>{UUID4_REGEX})/h/(?P<height>[0-9]{{1,5}})/", serve_views.serve_resized_image, name="serve_resized_image"),
+    re_path(rf"img/(?P<image_id>{UUID4_REGEX})/", serve_views.serve_image, name="serve_image"),
+    re_path(rf"img/thumb/(?P<image_id>{UUID4_REGEX})/", serve_views.serve_thumbnail_image, name="serve_thumbnail_image"),
+    re_path(rf"img/temp/(?P<image_id>{UUID4_REGEX})/", serve_views.serve_temp_image, name="serve_temp_image"),
+    re_path(r"img/temp/s/(?P<token>[A-Za-z0-9_\-]+:[A-Za-z0-9_\-]+)/", serve_views.serve_signed_temp_image, name="serve_signed_temp_image"),
 ]
@@ -1,22 +1,217 @@
+import hashlib
+import mimetypes
 import os
+import re
 import uuid
-from typing import Union
+from typing import AsyncIterator, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
+from urllib.parse import quote
 from PIL import Image
-from django.http import FileResponse, HttpResponseNotFound
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotFound, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.utils.deconstruct import deconstructible
+from django.utils.http import http_date, parse_http_date_safe
 from django.core.exceptions import ValidationError
 from django.apps import apps
+from asgiref.sync import sync_to_async
+from .config import FILE_DELIVERY_X_ACCEL, MAX_BYTE_RANGES, RANGE_CHUNK_SIZE, THUMBNAIL_VARIANT_FORMATS
 
 
-def get_file_response(filename_path: str) -> Union[FileResponse, HttpResponseNotFound]:
+BYTE_RANGE_REGEX = re.compile(r'^(\d*)-(\d*)$')
+
+# unknown to `mimetypes` before Python 3.11, used for the Content-Type of variants
+for variant, (pil_format, media_type) in THUMBNAIL_VARIANT_FORMATS.items():
+    mimetypes.add_type(media_type, f".{variant}")
+
+
+def get_x_accel_redirect_response(filename_path: str) -> Union[HttpResponse, None]:
+    '''
+    Empty response telling nginx to send the file itself, `None` for files outside of MEDIA_ROOT
+    '''
+    relative_path = os.path.relpath(filename_path, settings.MEDIA_ROOT)
+    if relative_path.startswith(os.pardir):
+        return None
+    content_type, encoding = mimetypes.guess_type(filename_path)
+    response = HttpResponse(content_type=content_type or 'application/octet-stream')
+    response['X-Accel-Redirect'] = f"{settings.X_ACCEL_REDIRECT_LOCATION}{quote(relative_path)}"
+    return response
+
+
+def parse_range_header(range_header: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    '''
+    Satisfiable byte ranges as (first byte, last byte) of a file of the given size.
+    `None` when the header is invalid and should be ignored, an empty list when no range is satisfiable.
+    '''
+    units, _, byte_ranges = range_header.partition('=')
+    if units.strip().lower() != 'bytes':
+        return None
+
+    ranges = []
+    for byte_range in byte_ranges.split(','):
+        match = BYTE_RANGE_REGEX.match(byte_range.strip())
+        if not match or match.groups() == ('', ''):
+            return None
+        first, last = match.groups()
+        if not first:
+            # suffix range, the last N bytes
+            if int(last) > 0 and size > 0:
+                ranges.append((max(size - int(last), 0), size - 1))
+            continue
+        if last and int(last) < int(first):
+            return None
+        if int(first) < size:
+            ranges.append((int(first), min(int(last), size - 1) if last else size - 1))
+    return ranges
+
+
+def read_file_range(file, first: int, last: int) -> Iterator[bytes]:
+    file.seek(first)
+    remaining = last - first + 1
+    while remaining > 0:
+        chunk = file.read(min(RANGE_CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+
+def get_range_response(request, filename_path: str, size: int, etag: str, last_modified: int) -> Optional[HttpResponse]:
+    '''
+    `206 Partial Content` or `416 Range Not Satisfiable` for requests with a Range header,
+    `None` when the whole file should be sent
+    '''
+    range_header = request.headers.get('Range')
+    if request.method != 'GET' or not range_header:
+        return None
+    # ranges of a file that changed since the client's copy make no sense, it gets the whole file
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range != etag and parse_http_date_safe(if_range) != last_modified:
+        return None
+
+    ranges = parse_range_header(range_header, size)
+    if ranges is None or len(ranges) > MAX_BYTE_RANGES:
+        return None
+    if not ranges:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f"bytes */{size}"
+        return response
+
+    content_type = mimetypes.guess_type(filename_path)[0] or 'application/octet-stream'
+    if len(ranges) == 1:
+        first, last = ranges[0]
+
+        def content():
+            with open(filename_path, 'rb') as file:
+                yield from read_file_range(file, first, last)
+
+        response = StreamingHttpResponse(content(), status=206, content_type=content_type)
+        response['Content-Range'] = f"bytes {first}-{last}/{size}"
+        response['Content-Length'] = last - first + 1
+        return response
+
+    boundary = uuid.uuid4().hex
+    part_headers = [
+        f"--{boundary}\r\nContent-Type: {content_type}\r\nContent-Range: bytes {first}-{last}/{size}\r\n\r\n".encode()
+        for first, last in ranges
+    ]
+    closing_boundary = f"--{boundary}--\r\n".encode()
+
+    def multipart_content():
+        with open(filename_path, 'rb') as file:
+            for part_header, (first, last) in zip(part_headers, ranges):
+                yield part_header
+                yield from read_file_range(file, first, last)
+                yield b"\r\n"
+        yield closing_boundary
+
+    response = StreamingHttpResponse(multipart_content(), status=206, content_type=f"multipart/byteranges; boundary={boundary}")
+    response['Content-Length'] = (
+        sum(len(part_header) + last - first + 1 + 2 for part_header, (first, last) in zip(part_headers, ranges)) + len(closing_boundary)
+    )
+    return response
+
+
+def get_file_response(request, filename_path: str, max_age: Optional[int] = None) -> Union[FileResponse, HttpResponse, HttpResponseNotFound]:
+    '''
+    Response with the file, or `304 Not Modified` when the client's copy is still valid, or the requested ranges of it.
+    Responses are cacheable for `max_age` seconds, afterwards clients revalidate them with the ETag or Last-Modified.
+    '''
     try:
-        img_file = open(filename_path, 'rb')
-        response = FileResponse(img_file)
+        file_stat = os.stat(filename_path)
     except FileNotFoundError:
-        response = HttpResponseNotFound("Image not found")
+        return HttpResponseNotFound("Image not found")
+    # the same format as nginx, validators don't change with the delivery backend
+    etag = f'"{int(file_stat.st_mtime):x}-{file_stat.st_size:x}"'
+    last_modified = int(file_stat.st_mtime)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None and settings.FILE_DELIVERY_BACKEND == FILE_DELIVERY_X_ACCEL:
+        response = get_x_accel_redirect_response(filename_path)
+    if response is None:
+        response = get_range_response(request, filename_path, file_stat.st_size, etag, last_modified)
+        if response is not None and response.status_code == 416:
+            return response
+    if response is None:
+        try:
+            response = FileResponse(open(filename_path, 'rb'))
+        except FileNotFoundError:
+            return HttpResponseNotFound("Image not found")
+        # FileResponse reads 4 KiB at a time, each read is a worker thread hop in async views
+        response.block_size = RANGE_CHUNK_SIZE
+        response['Accept-Ranges'] = 'bytes'
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if max_age is not None:
+        patch_cache_control(response, public=True, max_age=max_age)
+    return response
+
+
+async def iterate_in_thread(iterator) -> AsyncIterator[bytes]:
+    '''
+    Chunks of a blocking iterator (e.g. reading a file) read in a worker thread, the event loop keeps serving other requests
+    '''
+    iterator = iter(iterator)
+    while True:
+        chunk = await sync_to_async(next, thread_sensitive=False)(iterator, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+async def aget_file_response(request, filename_path: str, max_age: Optional[int] = None) -> HttpResponse:
+    '''
+    `get_file_response` for async views, the file is opened and streamed without blocking the event loop
+    '''
+    response = await sync_to_async(get_file_response, thread_sensitive=False)(request, filename_path, max_age)
+    if response.streaming:
+        # Django would read a synchronous iterator into memory at once under ASGI
+        response.streaming_content = iterate_in_thread(response.streaming_content)
     return response
 
 
+def get_content_hash(file) -> str:
+    content_hash = hashlib.sha256()
+    for chunk in file.chunks():
+        content_hash.update(chunk)
+    file.seek(0)
+    return content_hash.hexdigest()
+
+
+def get_accepted_media_types(accept_header: str) -> Set[str]:
+    '''
+    Media types listed explicitly in the Accept header, without the ones refused with `q=0`
+    '''
+    accepted_media_types = set()
+    for accepted in accept_header.split(','):
+        media_type, *parameters = [part.strip() for part in accepted.split(';')]
+        if any(parameter.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000') for parameter in parameters):
+            continue
+        if media_type:
+            accepted_media_types.add(media_type.lower())
+    return accepted_media_types
+
+
 @deconstructible
 class GenerateRandomFileName(object):
 
@@ -29,9 +224,49 @@ class GenerateRandomFileName(object):
         return os.path.join(self.path_prefix, random_filename)
 
 
+class ImageProbe(NamedTuple):
+    format: str
+    width: int
+    height: int
+
+    @property
+    def pixels(self) -> int:
+        return self.width * self.height
+
+
+def probe_image(file) -> ImageProbe:
+    '''
+    Format and dimensions read from the image header, without decoding the pixels.
+    The result is cached on the file, validators and the model reuse it instead of opening the upload again.
+    '''
+    # a FieldFile of an upload wraps the uploaded file, which may have been probed already
+    probed_files = [file, getattr(file, '_file', None)]
+    for probed_file in probed_files:
+        image_probe = getattr(probed_file, '_image_probe', None)
+        if image_probe is not None:
+            return image_probe
+
+    # `Image.open` parses only the header, pixels are decoded on first access
+    with Image.open(file) as img:
+        image_probe = ImageProbe(img.format, *img.size)
+    file.seek(0)
+    for probed_file in probed_files:
+        if probed_file is not None:
+            probed_file._image_probe = image_probe
+    return image_probe
+
+
+def validate_image_max_pixels(image):
+    try:
+        image_pixels = probe_image(image).pixels
+    except Image.DecompressionBombError:
+        raise ValidationError(f"Image can have at most {settings.MAX_IMAGE_PIXELS} pixels.")
+    if image_pixels > settings.MAX_IMAGE_PIXELS:
+        raise ValidationError(f"Image can have at most {settings.MAX_IMAGE_PIXELS} pixels, current have {image_pixels} pixels.")
+
+
 def validate_image_min_height(image):
     image_min_height = apps.get_model('imagesservice.ThumbnailSize').objects.get_max_height()
-    with Image.open(image) as img:
-        image_width, image_height = img.size
-        if image_height < image_min_height:
-            raise ValidationError(f"Image height must be at least {image_min_height} px, current have {image_height} px.")
+    image_height = probe_image(image).height
+    if image_height < image_min_height:
+        raise ValidationError(f"Image height must be at least {image_min_height} px, current have {image_height} px.")
@@ -1,41 +1,115 @@
-
-from django.http import HttpResponseNotFound, HttpResponseForbidden
-from django.shortcuts import get_object_or_404
+import time
+from typing import Optional
+from django.conf import settings
+from django.http import Http404, HttpResponseNotFound, HttpResponseForbidden
+from django.utils.cache import patch_vary_headers
+from . import serve_cache, signed_links
 from .config import UPGRADE_ACCOUNT_TIER_MESSAGE
-from .models import Image, ExpiringImage, ThumbnailImage
-from .utils import get_file_response
+from .models import Image, ExpiringImage, ThumbnailImage, clamp_resize_height, get_accepted_file_path
+from .resize_cache import get_resized_image_path
+from .utils import get_file_response, get_accepted_media_types
+
+
+def load_image_record(image_id) -> Optional[dict]:
+    image = Image.objects.for_serving().filter(id=image_id).first()
+    return image.get_serve_record() if image else None
+
+
+def load_thumbnail_image_record(image_id) -> Optional[dict]:
+    image = ThumbnailImage.objects.for_serving().filter(id=image_id).first()
+    return image.get_serve_record() if image else None
+
+
+def load_temp_image_record(image_id) -> Optional[dict]:
+    image = ExpiringImage.objects.for_serving().filter(id=image_id).first()
+    return image.get_serve_record() if image else None
+
+
+def get_record_or_404(kind: str, image_id, load) -> dict:
+    record = serve_cache.get_record(kind, image_id, load)
+    if record is None:
+        raise Http404
+    return record
 
 
 def serve_image(request, image_id):
     '''
     Serve original image
     '''
-    image: Image = get_object_or_404(Image, id=image_id)
-    if not image.can_be_displayed():
+    record = get_record_or_404('image', image_id, load_image_record)
+    if not record['can_be_displayed']:
+        return HttpResponseForbidden(UPGRADE_ACCOUNT_TIER_MESSAGE)
+    return get_file_response(request, record['path'], settings.IMAGE_CACHE_MAX_AGE)
+
+
+def serve_resized_image(request, image_id, height):
+    '''
+    Serve original image resized to the given height, clamped to the range of the owner's account tier
+    '''
+    record = get_record_or_404('image', image_id, load_image_record)
+    resize_height = clamp_resize_height(int(height), record['min_resize_height'], record['max_resize_height'])
+    if resize_height is None:
         return HttpResponseForbidden(UPGRADE_ACCOUNT_TIER_MESSAGE)
-    return get_file_response(image.filename.path)
+    try:
+        resized_image_path = get_resized_image_path(record['path'], record['name'], resize_height)
+    except FileNotFoundError:
+        return HttpResponseNotFound("Image not found")
+    return get_file_response(request, resized_image_path, settings.IMAGE_CACHE_MAX_AGE)
 
 
 def serve_thumbnail_image(request, image_id):
     '''
     Serve original image
     '''
-    image: ThumbnailImage = get_object_or_404(ThumbnailImage, id=image_id)
-    if not image.can_be_displayed():
+    record = get_record_or_404('thumbnail', image_id, load_thumbnail_image_record)
+    if not record['can_be_displayed']:
         return HttpResponseForbidden(UPGRADE_ACCOUNT_TIER_MESSAGE)
-    return get_file_response(image.filename.path)
+    if not record['path']:
+        # saving the rendered thumbnail invalidates the cached record
+        image: ThumbnailImage = ThumbnailImage.objects.for_serving().get(id=image_id)
+        image.render()
+        record = image.get_serve_record()
+    accepted_media_types = get_accepted_media_types(request.headers.get('Accept', ''))
+    file_path = get_accepted_file_path(record['path'], record['variants'], accepted_media_types)
+    response = get_file_response(request, file_path, settings.IMAGE_CACHE_MAX_AGE)
+    patch_vary_headers(response, ('Accept',))
+    return response
 
 
 def serve_temp_image(request, image_id):
     '''
     Serve temporary, expiration image
     '''
-    image: ExpiringImage = get_object_or_404(ExpiringImage, id=image_id)
+    record = get_record_or_404('temp', image_id, load_temp_image_record)
 
-    if not image.can_be_displayed():
+    if not record['can_be_displayed']:
         return HttpResponseForbidden(UPGRADE_ACCOUNT_TIER_MESSAGE)
 
-    if image.is_expired:
+    remaining_lifetime = int(record['expiration_timestamp'] - time.time())
+    if remaining_lifetime < 0:
+        return HttpResponseNotFound("Image expired")
+
+    # cached at most until the link expires
+    return get_file_response(request, record['path'], min(remaining_lifetime, settings.IMAGE_CACHE_MAX_AGE))
+
+
+def serve_signed_temp_image(request, token):
+    '''
+    Serve temporary, expiration image of a signed link, expired links are rejected without any lookup
+    '''
+    link = signed_links.verify(token)
+    if link is None:
+        raise Http404
+
+    remaining_lifetime = link.expires - int(time.time())
+    if remaining_lifetime < 0:
         return HttpResponseNotFound("Image expired")
+    if signed_links.is_revoked(link):
+        return HttpResponseNotFound("Image expired")
+
+    record = get_record_or_404('image', link.image_id, load_image_record)
+    if not record['can_see_expiring_img']:
+        return HttpResponseForbidden(UPGRADE_ACCOUNT_TIER_MESSAGE)
 
-    return get_file_response(image.image.filename.path)
+    # cached at most until the link expires
+    return get_file_response(request, record['path'], min(remaining_lifetime, settings.IMAGE_CACHE_MAX_AGE))
@@ -88,6 +88,25 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# serve records, tier versions and cached settings are shared by all processes only with "redis" (or "file" on a single host),
+# "locmem" keeps them per process; CACHE_LOCATION is the redis:// URL or the directory of the files
+
+CACHE_BACKENDS = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+    "redis": "django.core.cache.backends.redis.RedisCache",
+}
+
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKENDS[os.getenv("CACHE_BACKEND", "locmem")],
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -135,6 +154,39 @@ MEDIA_URL = '/media/'
 
 ALLOWED_IMAGE_EXTENSIONS = ['png', 'jpg', 'jpeg']
 
+# async versions of the `/img/` views, for ASGI servers (see Dockerfile)
+ASYNC_SERVE_VIEWS = os.getenv('ASYNC_SERVE_VIEWS', 'false').lower() == 'true'
+
+# "django" streams image files from the app, "x-accel" only authorizes the request and lets nginx send the file
+# from the internal location mapped to MEDIA_ROOT (see nginx.conf)
+FILE_DELIVERY_BACKEND = os.getenv('FILE_DELIVERY_BACKEND', 'django')
+X_ACCEL_REDIRECT_LOCATION = os.getenv('X_ACCEL_REDIRECT_LOCATION', '/protected-media/')
+
+# seconds browsers and CDNs may reuse served images before revalidating them, links to expiring images are capped at their lifetime
+IMAGE_CACHE_MAX_AGE = int(os.getenv('IMAGE_CACHE_MAX_AGE', str(365 * 24 * 3600)))
+
+# expiring links as `/img/temp/s/<TOKEN>/`, signed instead of stored, checked without querying the database
+SIGNED_EXPIRING_LINKS = os.getenv('SIGNED_EXPIRING_LINKS', 'false').lower() == 'true'
+# the first key signs new links, the others are still accepted, SECRET_KEY is used without any
+EXPIRING_LINK_SIGNING_KEYS = [key for key in os.getenv('EXPIRING_LINK_SIGNING_KEYS', '').split(',') if key]
+
+# uploads with more pixels are rejected from their header, before anything gets decoded
+MAX_IMAGE_PIXELS = int(os.getenv('MAX_IMAGE_PIXELS', '50000000'))
+
+# "eager" renders thumbnails while saving the image,
+# "queued" leaves them pending for the `thumbnail_worker` management command,
+# "lazy" renders every thumbnail on its first request
+THUMBNAIL_GENERATION_MODE = os.getenv('THUMBNAIL_GENERATION_MODE', 'eager')
+
+# modern formats rendered next to every thumbnail, served to clients accepting them; AVIF needs `pillow-avif-plugin`
+THUMBNAIL_VARIANTS = [variant for variant in os.getenv('THUMBNAIL_VARIANTS', 'webp,avif').split(',') if variant]
+
+# size of the process pool rendering thumbnail sizes in parallel, 0 renders them one by one in the calling thread
+THUMBNAIL_RENDER_WORKERS = int(os.getenv('THUMBNAIL_RENDER_WORKERS', '0'))
+
+# bytes on disk of images resized on request to `/img/<ID>/h/<HEIGHT>/`, the least recently used ones are evicted above it
+RESIZE_CACHE_MAX_BYTES = int(os.getenv('RESIZE_CACHE_MAX_BYTES', str(512 * 1024 ** 2)))
+
 REST_FRAMEWORK = {
    'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',